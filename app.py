@@ -9,12 +9,16 @@ import os
 # Add the current directory to Python path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from src.gui.main_window import MainWindow
-
 
 def main():
     """Main function to start the application"""
+    # Any arguments select the headless CLI, which never imports Tk
+    if len(sys.argv) > 1:
+        from src.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+    
     try:
+        from src.gui.main_window import MainWindow
         app = MainWindow()
         app.run()
     except Exception as e:
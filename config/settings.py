@@ -3,7 +3,6 @@ Configuration settings for KK Manager Download
 """
 
 import os
-import customtkinter as ctk
 
 # Application Settings
 APP_NAME = "KKManager Download Max Speed - AI Shoujo Full Mod"
@@ -11,9 +10,9 @@ APP_VERSION = "2.0.0"
 WINDOW_SIZE = "1000x700"
 MIN_WINDOW_SIZE = (800, 600)
 
-# Theme Settings
-ctk.set_appearance_mode("dark")
-ctk.set_default_color_theme("blue")
+# Theme Settings (applied when the GUI starts)
+APPEARANCE_MODE = "dark"
+COLOR_THEME = "blue"
 
 # Colors
 COLORS = {
@@ -39,23 +38,122 @@ SUPPORTED_FILE_TYPES = [
     # Images
     ".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp",
     # Code/Executable
-    ".dll", ".bat", ".sh", ".py", ".js", ".css", ".html"
+    ".dll", ".bat", ".sh", ".py", ".js", ".css", ".html",
+    # Checksums (also used to verify the files they describe)
+    ".sha256", ".md5"
 ]
 
 # Network Settings
 REQUEST_TIMEOUT = 10  # seconds
-MAX_CONCURRENT_DOWNLOADS = 3
-CHUNK_SIZE = 8192
+MAX_CONCURRENT_DOWNLOADS = 3  # initial number of concurrent transfers
+CHUNK_SIZE = 64 * 1024  # first and smallest read size of a download
+CHUNK_SIZE_MAX = 4 * 1024 * 1024  # reads grow up to this on fast links
+CHUNK_TARGET_TIME = 0.05  # seconds one read should take; sizes adapt toward it
+LISTING_CHUNK_SIZE = 64 * 1024  # bytes fed to the listing parser at a time
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+DOWNLOAD_TIMEOUT = 30  # seconds
+
+# Download order: "scan", "smallest_first", "largest_first" or "interleaved"
+DOWNLOAD_SCHEDULE = "interleaved"
+
+# Pipelined Scan-and-Download (files start downloading while the crawl runs)
+PIPELINE_MODE_DEFAULT = False  # GUI checkbox; the CLI pipelines unless --no-pipeline is given
+PIPELINE_QUEUE_SIZE = 1000  # discovered files waiting for a worker before the scan is held back
+
+# Bandwidth Limits (bytes per second, 0 = unlimited; adjustable while downloading)
+BANDWIDTH_LIMIT = 0  # total for all downloads
+BANDWIDTH_HOST_LIMITS = {}  # e.g. {"sideload.betterrepack.com": 5 * 1024 * 1024}
+BANDWIDTH_BURST = 0.5  # seconds of traffic a limit lets through at once
+
+# Retry Settings (failed listings and files go back into the queue)
+RETRY_MAX_ATTEMPTS = 5  # tries per listing or file, including the first
+RETRY_BASE_DELAY = 1.0  # seconds, doubled on each retry with random jitter
+RETRY_MAX_DELAY = 60.0
+RETRY_AFTER_MAX = 300.0  # longest Retry-After wait honoured
+RETRY_STATUSES = (408, 425, 429, 500, 502, 503, 504)  # other HTTP errors fail at once
+CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failures that pause all requests to a host
+CIRCUIT_COOLDOWN = 30.0  # seconds before a paused host gets a probe request
+
+# Adaptive Concurrency Settings (AIMD on measured throughput)
+CONCURRENCY_ADAPTIVE = True  # False keeps MAX_CONCURRENT_DOWNLOADS fixed
+CONCURRENCY_FLOOR = 1
+CONCURRENCY_CEILING = 16  # worker threads; the asyncio backend uses ASYNC_MAX_IN_FLIGHT
+CONCURRENCY_INTERVAL = 2.0  # seconds between adjustments
+CONCURRENCY_BACKOFF = 0.5  # limit multiplier after throttling (429/503) or errors
+CONCURRENCY_TOLERANCE = 0.05  # throughput gain needed to keep the last increase
+CONCURRENCY_LATENCY_FACTOR = 3.0  # time to first byte above this multiple of the best seen shrinks the limit
+CONCURRENCY_ERROR_RATE = 0.2  # share of failed transfers per interval treated as congestion
+
+# Progress Reporting Settings
+PROGRESS_UPDATE_HZ = 10  # maximum progress callbacks per second
+SPEED_WINDOW = 5.0  # seconds of history used for the current speed
+
+# Connection Pool Settings
+HTTP_POOL_HOSTS = 10  # hosts kept in the connection pool
+HTTP_POOL_PER_HOST = 32  # keep-alive connections per host
+HTTP_MAX_RETRIES = 3  # immediate retries of dropped connections; error statuses use RETRY_*
+HTTP_RETRY_BACKOFF = 0.5  # seconds, doubled on each retry
+
+# Segmented Download Settings (HTTP Range)
+SEGMENT_MIN_SIZE = 16 * 1024 * 1024  # smaller files use a single stream
+SEGMENT_TARGET_SIZE = 32 * 1024 * 1024  # bytes per segment before capping
+MAX_SEGMENTS_PER_FILE = 8
+
+# Resume Settings
+PART_SUFFIX = ".part"  # partial data, renamed when complete
+JOURNAL_SUFFIX = ".json"  # completed ranges and validators next to the .part file
+RESUME_MIN_SIZE = 1024 * 1024  # smaller files restart from byte zero
+JOURNAL_SAVE_INTERVAL = 1.0  # seconds between journal writes
+
+# Sync Settings
+SYNC_MODE_DEFAULT = True  # only download new or changed files
+SYNC_MANIFEST_NAME = ".kkmanager_manifest.json"  # stored in the download folder
+
+# Integrity Settings
+VERIFY_DOWNLOADS = True  # hash files while writing and check them against published checksums
+HASH_ALGORITHM = "sha256"  # stored in the sync manifest; "xxh3_64" needs the xxhash package
+CHECKSUM_SIDECAR_SUFFIXES = (".sha256", ".md5")  # checksum files published next to a file
+CHECKSUM_READ_SIZE = 1024 * 1024  # bytes per read when hashing data already on disk
+
+# Network backend: "requests" (thread pool) or "asyncio" (aiohttp event loop)
+NETWORK_BACKEND = "requests"
+ASYNC_MAX_IN_FLIGHT = 200  # concurrent requests on one event loop
 
 # Scanning Settings
 MAX_SCAN_DEPTH = 15
 SCAN_SLEEP_TIME = 0.1  # seconds when paused
+SCAN_WORKERS = 8  # concurrent listing fetchers
+SIZE_HEAD_FALLBACK = True  # HEAD files whose listing shows no size
+HEAD_BATCH_SIZE = 256  # files per batch of fallback HEAD requests
+HEAD_BATCH_WORKERS = 16  # concurrent HEAD requests per batch
+
+# Scan Cache Settings
+SCAN_CACHE_ENABLED = True
+SCAN_CACHE_MAX_AGE = 300  # seconds a cached listing is trusted without revalidation
+SCAN_CACHE_MAX_BYTES = 64 * 1024 * 1024  # least recently used listings are evicted beyond this
+
+# Scan Snapshot Settings (completed scans kept for reloading and diffing)
+SCAN_SNAPSHOTS_ENABLED = True
+SCAN_SNAPSHOTS_KEEP = 5  # newest snapshots kept per root URL
+
+# Download Job Settings (per-file progress kept on disk so runs survive restarts)
+DOWNLOAD_JOBS_ENABLED = True
+DOWNLOAD_JOBS_KEEP_RUNS = 20  # newest download runs kept with their files
+JOB_FLUSH_BATCH = 256  # buffered state changes written in one transaction
+JOB_FLUSH_INTERVAL = 1.0  # seconds before buffered state changes are written anyway
 
 # Default Paths
 DEFAULT_DOWNLOAD_FOLDER = os.path.join(os.getcwd(), "downloaded_files")
+APP_DATA_FOLDER = os.path.join(os.path.expanduser("~"), ".kkmanager_download")
+SCAN_CACHE_PATH = os.path.join(APP_DATA_FOLDER, "scan_cache.db")
+SCAN_SNAPSHOT_PATH = os.path.join(APP_DATA_FOLDER, "scan_snapshots.db")
+DOWNLOAD_JOBS_PATH = os.path.join(APP_DATA_FOLDER, "download_jobs.db")
 
 # UI Settings
+UI_DRAIN_INTERVAL = 50  # milliseconds between drains of worker events
+UI_DRAIN_BUDGET = 0.02  # seconds of event handling per drain before yielding to Tk
+FILE_LIST_ROW_HEIGHT = 24  # pixels per row of the virtualized file list
+FAILURE_REPORT_LINES = 20  # failed files listed in the end-of-download report
 SCROLL_COLORS = {
     'button': "#2B2B2B",
     'button_hover': "#343638"
@@ -0,0 +1,389 @@
+"""
+Headless command line interface: scan, download and sync without the GUI
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from config.settings import APP_NAME, APP_VERSION, NETWORK_BACKEND, DOWNLOAD_SCHEDULE
+from src.core.scanner import DirectoryScanner
+from src.core.downloader import DownloadManager
+from src.core.stats import ProgressThrottle
+from src.core.scheduling import SCHEDULING_POLICIES
+from src.core.pipeline import FilePipeline, glob_filter, combine_filters
+from src.core.scan_snapshots import changed_since
+from src.core.sync import sync_key
+from src.utils.file_utils import is_valid_url
+from src.utils.listing_parser import parse_size
+from src.utils.network_utils import create_network_manager
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FILES_FAILED = 1  # some files could not be downloaded
+EXIT_USAGE = 2  # invalid arguments (also used by argparse)
+EXIT_SCAN_FAILED = 3  # the scan was cancelled or found nothing
+EXIT_FOLDERS_FAILED = 4  # some folders could not be listed, so their files are missing
+EXIT_INTERRUPTED = 130  # stopped with Ctrl+C
+
+WAIT_INTERVAL = 0.2  # seconds between checks for Ctrl+C while waiting
+JOBS_LISTED = 10  # download runs printed by the jobs command
+
+
+class CommandLineApp:
+    """Drive DirectoryScanner and DownloadManager, printing JSON lines"""
+    
+    def __init__(self, backend=NETWORK_BACKEND, quiet=False, output=None, schedule=DOWNLOAD_SCHEDULE,
+                 checksum_manifest=None, file_filter=None, pipelined=True, only_changed=False, from_snapshot=False):
+        self.network_manager = create_network_manager(backend)
+        self.scanner = DirectoryScanner(self.network_manager)
+        self.downloader = DownloadManager(self.network_manager)
+        self.quiet = quiet
+        self.schedule = schedule
+        self.checksum_manifest = checksum_manifest
+        self.file_filter = file_filter
+        self.pipelined = pipelined
+        self.only_changed = only_changed
+        self.from_snapshot = from_snapshot
+        self.output = output or sys.stdout
+        self.scan_status = None
+        self.scan_errors = 0
+        self.download_errors = []
+        self.download_done = threading.Event()
+        self.scan_throttle = ProgressThrottle()
+        
+        self.scanner.set_progress_callback(self._on_scan_progress)
+        self.downloader.set_progress_callback(self._on_download_progress)
+        self.downloader.set_error_callback(self._on_download_error)
+        self.downloader.set_completion_callback(self.download_done.set)
+    
+    def emit(self, event, **fields):
+        """Print one machine-readable event"""
+        self.output.write(json.dumps(dict(event=event, time=round(time.time(), 3), **fields), ensure_ascii=False) + "\n")
+        self.output.flush()
+    
+    # Callbacks from worker threads
+    def _on_scan_progress(self, status_type, message):
+        if status_type == "error":
+            self.scan_errors += 1
+        elif status_type in ("completed", "cancelled"):
+            self.scan_status = status_type
+        
+        if self.quiet and status_type != "error":
+            return
+        if status_type == "scanning" and not self.scan_throttle.ready():
+            return
+        self.emit("scan", status=status_type, message=message)
+    
+    def _on_download_progress(self, progress_data):
+        if not self.quiet:
+            self.emit("progress", **progress_data)
+    
+    def _on_download_error(self, error_message):
+        self.download_errors.append(error_message)
+        self.emit("error", message=error_message)
+    
+    # Commands
+    def scan(self, url, pipeline=None):
+        """Scan url, feeding pipeline if given; returns the scan results, or None if the scan did not complete"""
+        worker = threading.Thread(target=self.scanner.scan, args=(url, pipeline), daemon=True)
+        worker.start()
+        try:
+            while worker.is_alive():
+                worker.join(WAIT_INTERVAL)
+        except KeyboardInterrupt:
+            self.scanner.cancel_scan()
+            if pipeline:
+                pipeline.cancel()
+            worker.join()
+            raise
+        
+        results = self.scanner.get_scan_results()
+        self.emit(
+            "scan_done",
+            status=self.scan_status or "error",
+            files=results["total_files"],
+            folders=results["total_folders"],
+            bytes=results["total_bytes"],
+            folder_errors=self.scan_errors,
+            folders_per_second=round(results["folders_per_second"], 1),
+            changes=results["changes"]
+        )
+        return results if self.scan_status == "completed" else None
+    
+    def download(self, files, download_folder, sync=False):
+        """Download files into download_folder and wait until done"""
+        os.makedirs(download_folder, exist_ok=True)
+        kept = [file_info for file_info in files if self.file_filter is None or self.file_filter(file_info)]
+        self.download_done.clear()
+        self.downloader.start_download(
+            kept, download_folder, sync=sync, schedule=self.schedule,
+            listing=files, checksum_manifest=self.checksum_manifest
+        )
+        return self._wait_for_download(len(files) - len(kept))
+    
+    def scan_and_download(self, url, download_folder, sync=False):
+        """Download files while the scan is still discovering them; returns the scan results and exit code"""
+        os.makedirs(download_folder, exist_ok=True)
+        pipeline = FilePipeline(file_filter=self.file_filter)
+        self.download_done.clear()
+        self.downloader.start_pipeline(
+            pipeline, download_folder, sync=sync, schedule=self.schedule, checksum_manifest=self.checksum_manifest
+        )
+        try:
+            results = self.scan(url, pipeline)
+        except KeyboardInterrupt:
+            self.downloader.stop_download()
+            self.download_done.wait()
+            raise
+        return results, self._wait_for_download(pipeline.filtered)
+    
+    def _wait_for_download(self, filtered_files):
+        """Wait for the running download and report its totals"""
+        try:
+            while not self.download_done.wait(WAIT_INTERVAL):
+                pass
+        except KeyboardInterrupt:
+            # Keep .part files and journals so the next run resumes
+            self.downloader.stop_download()
+            self.download_done.wait()
+            raise
+        
+        stats = self.downloader.get_download_stats()
+        self.emit(
+            "download_done",
+            files=stats['total_files'],
+            completed_files=stats['completed_files'],
+            failed_files=len(self.download_errors),
+            downloaded_bytes=stats['downloaded_bytes'],
+            skipped_files=stats['skipped_files'],
+            skipped_bytes=stats['skipped_bytes'],
+            filtered_files=filtered_files,
+            schedule=stats['schedule'],
+            elapsed=round(time.time() - stats['start_time'], 2),
+            run_id=self.downloader.run_id
+        )
+        return EXIT_FILES_FAILED if self.download_errors else EXIT_OK
+    
+    def run(self, command, url=None, download_folder=None, run_id=None):
+        """Run one command, report what failed for good and return the exit code"""
+        exit_code = self._run_command(command, url, download_folder, run_id)
+        self.report_failures()
+        return exit_code
+    
+    def report_failures(self):
+        """Print one event listing the folders and files that failed after all retries"""
+        folders = self.scanner.get_scan_results()["failed_folders"]
+        files = self.downloader.get_failure_report()
+        if folders or files:
+            self.emit("failure_report", folders=folders, files=files)
+    
+    def emit_diff(self):
+        """Print the files added, removed and changed since the previous snapshot"""
+        changes = self.scanner.changes
+        fields = dict(compared=changes is not None)
+        for key in ("added", "removed", "changed"):
+            fields[key] = [sync_key(file_info) for file_info in changes[key]] if changes else []
+            fields[f"{key}_bytes"] = changes[f"{key}_bytes"] if changes else 0
+        self.emit("diff", **fields)
+    
+    def _changed_filter(self, url):
+        """Filter for files new or changed since the newest snapshot of url (the one before it with --from-snapshot)"""
+        store = self.scanner.snapshot_store
+        snapshots = store.snapshots(url) if store else []
+        baseline = snapshots[1:2] if self.from_snapshot else snapshots[:1]
+        previous = store.load(baseline[0]['id']) if baseline else None
+        return changed_since(previous["file_links"]) if previous else None
+    
+    def _load_snapshot(self, url):
+        """Results of the newest saved scan of url, or None"""
+        results = self.scanner.load_snapshot(url)
+        if results is None:
+            print(f"Chưa có kết quả quét đã lưu cho {url}", file=sys.stderr)
+            return None
+        self.emit(
+            "snapshot_loaded",
+            snapshot_id=results["snapshot_id"],
+            created_at=round(results["created_at"], 3),
+            files=results["total_files"],
+            folders=results["total_folders"],
+            bytes=results["total_bytes"]
+        )
+        return results
+    
+    def emit_jobs(self, limit=JOBS_LISTED):
+        """Print the newest download runs with the state counts of their files"""
+        store = self.downloader.job_store
+        runs = store.runs(limit) if store else []
+        self.emit("jobs", runs=[
+            dict(run, sync=bool(run['sync']), created_at=round(run['created_at'], 3),
+                 finished_at=round(run['finished_at'], 3) if run['finished_at'] else None)
+            for run in runs
+        ])
+    
+    def resume(self, run_id=None):
+        """Continue the files an interrupted download run left over"""
+        self.download_done.clear()
+        if not self.downloader.resume_download(run_id):
+            print("Không có lượt tải nào còn dang dở", file=sys.stderr)
+            return EXIT_OK
+        self.emit("resumed", run_id=self.downloader.run_id, files=self.downloader.download_stats['total_files'])
+        return self._wait_for_download(0)
+    
+    def _run_command(self, command, url, download_folder, run_id=None):
+        """Scan, then download or sync as the command asks; returns the exit code"""
+        if command == "jobs":
+            self.emit_jobs()
+            return EXIT_OK
+        if command == "resume":
+            return self.resume(run_id)
+        if command == "diff":
+            results = self.scan(url)
+            if results is None:
+                return EXIT_SCAN_FAILED
+            self.emit_diff()
+            return self._folders_exit_code(results, EXIT_OK)
+        
+        if command != "scan" and self.only_changed:
+            self.file_filter = combine_filters(self.file_filter, self._changed_filter(url))
+        if command != "scan" and self.from_snapshot:
+            results = self._load_snapshot(url)
+            if results is None:
+                return EXIT_SCAN_FAILED
+            return self.download(list(results["file_links"]), download_folder, sync=command == "sync")
+        
+        if command != "scan" and self.pipelined:
+            results, exit_code = self.scan_and_download(url, download_folder, sync=command == "sync")
+        else:
+            results, exit_code = self.scan(url), EXIT_OK
+        
+        if results is None or (self.scan_errors and not results["total_folders"]):
+            return EXIT_SCAN_FAILED
+        if command != "scan" and not results["total_files"]:
+            return EXIT_SCAN_FAILED
+        if command != "scan" and not self.pipelined:
+            exit_code = self.download(list(results["file_links"]), download_folder, sync=command == "sync")
+        return self._folders_exit_code(results, exit_code)
+    
+    def _folders_exit_code(self, results, exit_code):
+        """Report folders that failed for good when nothing worse happened"""
+        if exit_code == EXIT_OK and results["failed_folders"]:
+            return EXIT_FOLDERS_FAILED
+        return exit_code
+
+
+def parse_rate(text):
+    """Parse a rate such as 500K, 5M or 1048576 into bytes per second"""
+    rate = parse_size(text.strip())
+    if rate is None:
+        raise argparse.ArgumentTypeError(f"tốc độ không hợp lệ: {text}")
+    return rate
+
+
+def parse_host_limit(text):
+    """Parse HOST=RATE into (host, bytes per second)"""
+    host, separator, rate = text.partition("=")
+    if not separator or not host:
+        raise argparse.ArgumentTypeError(f"cần dạng HOST=RATE: {text}")
+    return host, parse_rate(rate)
+
+
+def build_parser():
+    """Create the argument parser"""
+    parser = argparse.ArgumentParser(
+        prog="app.py",
+        description=f"{APP_NAME} - chế độ dòng lệnh. In tiến trình dạng JSON, mỗi dòng một sự kiện."
+    )
+    parser.add_argument("--version", action="version", version=APP_VERSION)
+    parser.add_argument(
+        "--backend", choices=("requests", "asyncio"), default=NETWORK_BACKEND,
+        help="backend mạng (mặc định: %(default)s)"
+    )
+    parser.add_argument(
+        "--schedule", choices=tuple(SCHEDULING_POLICIES), default=DOWNLOAD_SCHEDULE,
+        help="thứ tự tải tệp (mặc định: %(default)s)"
+    )
+    parser.add_argument(
+        "--limit-rate", metavar="RATE", type=parse_rate,
+        help="giới hạn tổng băng thông, ví dụ 500K hoặc 5M (byte/giây)"
+    )
+    parser.add_argument(
+        "--host-limit", metavar="HOST=RATE", action="append", default=[], type=parse_host_limit,
+        help="giới hạn băng thông cho một host, có thể lặp lại"
+    )
+    parser.add_argument("-q", "--quiet", action="store_true", help="chỉ in lỗi và kết quả cuối")
+    
+    commands = parser.add_subparsers(dest="command", required=True)
+    scan_parser = commands.add_parser("scan", help="quét thư mục và in tổng kết")
+    scan_parser.add_argument("url")
+    diff_parser = commands.add_parser("diff", help="quét rồi liệt kê tệp mới/đã xóa/thay đổi so với lần quét trước")
+    diff_parser.add_argument("url")
+    resume_parser = commands.add_parser("resume", help="tiếp tục tải các tệp còn dở của lượt tải bị ngắt")
+    resume_parser.add_argument("--run", type=int, metavar="ID", help="lượt tải cần tiếp tục (mặc định: lượt gần nhất còn dở)")
+    commands.add_parser("jobs", help="liệt kê các lượt tải gần đây và trạng thái tệp")
+    for name, help_text in (
+        ("download", "quét rồi tải tất cả tệp"),
+        ("sync", "quét rồi chỉ tải tệp mới/thay đổi")
+    ):
+        command_parser = commands.add_parser(name, help=help_text)
+        command_parser.add_argument("url")
+        command_parser.add_argument("dest", help="thư mục lưu")
+        command_parser.add_argument(
+            "--include", metavar="GLOB", action="append", default=[],
+            help="chỉ tải tệp có đường dẫn khớp mẫu, ví dụ '*.zip' (có thể lặp lại)"
+        )
+        command_parser.add_argument(
+            "--exclude", metavar="GLOB", action="append", default=[],
+            help="bỏ qua tệp có đường dẫn khớp mẫu (có thể lặp lại)"
+        )
+        command_parser.add_argument(
+            "--no-pipeline", dest="pipeline", action="store_false",
+            help="chờ quét xong mới bắt đầu tải (mặc định tải ngay khi tìm thấy tệp)"
+        )
+        command_parser.add_argument(
+            "--only-changed", action="store_true",
+            help="chỉ tải tệp mới hoặc thay đổi so với lần quét đã lưu gần nhất"
+        )
+        command_parser.add_argument(
+            "--from-snapshot", action="store_true",
+            help="không quét lại, dùng kết quả quét đã lưu gần nhất"
+        )
+        command_parser.add_argument(
+            "--checksums", metavar="FILE",
+            help="tệp checksum dạng sha256sum/md5sum (đường dẫn tương đối) để kiểm tra tệp tải về"
+        )
+    return parser
+
+
+def main(argv=None):
+    """Entry point for `python app.py scan|diff|download|sync|resume|jobs ...`; returns the exit code"""
+    args = build_parser().parse_args(argv)
+    if hasattr(args, "url") and not is_valid_url(args.url):
+        print(f"URL không hợp lệ: {args.url}", file=sys.stderr)
+        return EXIT_USAGE
+    
+    checksum_manifest = getattr(args, "checksums", None)
+    if checksum_manifest and not os.path.isfile(checksum_manifest):
+        print(f"Không tìm thấy tệp checksum: {checksum_manifest}", file=sys.stderr)
+        return EXIT_USAGE
+    
+    include = getattr(args, "include", [])
+    exclude = getattr(args, "exclude", [])
+    app = CommandLineApp(
+        backend=args.backend, quiet=args.quiet, schedule=args.schedule, checksum_manifest=checksum_manifest,
+        file_filter=glob_filter(include, exclude) if include or exclude else None,
+        pipelined=getattr(args, "pipeline", False),
+        only_changed=getattr(args, "only_changed", False),
+        from_snapshot=getattr(args, "from_snapshot", False)
+    )
+    if args.limit_rate:
+        app.downloader.set_bandwidth_limit(args.limit_rate)
+    for host, rate in args.host_limit:
+        app.downloader.set_bandwidth_limit(rate, host)
+    try:
+        return app.run(args.command, getattr(args, "url", None), getattr(args, "dest", None), getattr(args, "run", None))
+    except KeyboardInterrupt:
+        app.emit("interrupted")
+        return EXIT_INTERRUPTED
@@ -0,0 +1,210 @@
+"""
+Adaptive (AIMD) control of the number of concurrent transfers
+"""
+
+import time
+import threading
+from collections import deque
+from config.settings import (
+    CONCURRENCY_INTERVAL, CONCURRENCY_BACKOFF, CONCURRENCY_TOLERANCE,
+    CONCURRENCY_LATENCY_FACTOR, CONCURRENCY_ERROR_RATE
+)
+
+THROTTLE_STATUSES = (429, 503)
+LATENCY_SLACK = 0.1  # seconds of time-to-first-byte jitter ignored on fast links
+
+
+class ConcurrencyController:
+    """Grow the transfer limit additively while throughput improves, shrink it multiplicatively on throttling"""
+    
+    def __init__(self, initial, floor, ceiling, bytes_total, interval=CONCURRENCY_INTERVAL):
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self.limit = min(self.ceiling, max(self.floor, initial))
+        self.active = 0
+        self.interval = interval
+        self.decisions = deque(maxlen=100)  # most recent adjustments, for inspection
+        self._bytes_total = bytes_total
+        self._condition = threading.Condition()
+        self._listeners = []
+        self._reset_window(time.monotonic())
+        self._last_throughput = None
+        self._last_change = 0
+        self._base_latency = None
+    
+    def _reset_window(self, now):
+        """Start a new measurement interval"""
+        self._window_start = now
+        self._window_bytes = self._bytes_total()
+        self._next_update = now + self.interval
+        self._successes = 0
+        self._errors = 0
+        self._throttled = 0
+        self._latencies = []
+        self._peak_active = self.active
+    
+    def add_listener(self, callback):
+        """Call callback() whenever the limit changes"""
+        self._listeners.append(callback)
+    
+    # Slots
+    def try_acquire(self):
+        """Take a transfer slot if one is free"""
+        with self._condition:
+            if self.active >= self.limit:
+                return False
+            self.active += 1
+            self._peak_active = max(self._peak_active, self.active)
+            return True
+    
+    def acquire(self):
+        """Block until a transfer slot is free and take it"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+            self._peak_active = max(self._peak_active, self.active)
+    
+    def release(self):
+        """Return a transfer slot"""
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+    
+    # Measurements
+    def record_latency(self, seconds):
+        """Record the time to first byte of a transfer"""
+        with self._condition:
+            self._latencies.append(seconds)
+    
+    def record_success(self):
+        with self._condition:
+            self._successes += 1
+    
+    def record_error(self, status=None):
+        """Record a failed transfer; 429/503 answers count as throttling"""
+        with self._condition:
+            if status in THROTTLE_STATUSES:
+                self._throttled += 1
+            else:
+                self._errors += 1
+    
+    def maybe_update(self):
+        """Adjust the limit once per interval; cheap to call on every chunk"""
+        now = time.monotonic()
+        if now < self._next_update:
+            return
+        
+        with self._condition:
+            if now < self._next_update:
+                return
+            changed = self._update(now)
+        
+        if changed:
+            for callback in self._listeners:
+                callback()
+    
+    def _update(self, now):
+        """Apply one AIMD step from the finished interval; returns True if the limit changed"""
+        elapsed = now - self._window_start
+        throughput = (self._bytes_total() - self._window_bytes) / elapsed if elapsed > 0 else 0
+        latency = sum(self._latencies) / len(self._latencies) if self._latencies else None
+        if latency is not None:
+            self._base_latency = latency if self._base_latency is None else min(self._base_latency, latency)
+        
+        finished = self._successes + self._errors
+        limit = self.limit
+        if self._throttled:
+            limit, reason = int(limit * CONCURRENCY_BACKOFF), "throttled"
+        elif self._errors and self._errors >= finished * CONCURRENCY_ERROR_RATE:
+            limit, reason = int(limit * CONCURRENCY_BACKOFF), "errors"
+        elif latency is not None and latency > max(self._base_latency * CONCURRENCY_LATENCY_FACTOR,
+                                                   self._base_latency + LATENCY_SLACK):
+            limit, reason = limit - 1, "latency"
+        elif self._peak_active < self.limit:
+            reason = "idle"  # not enough work to use the current limit
+        elif (self._last_change > 0 and self._last_throughput
+              and throughput < self._last_throughput * (1 + CONCURRENCY_TOLERANCE)):
+            limit, reason = limit - 1, "no gain"
+        else:
+            limit, reason = limit + 1, "probe"
+        
+        limit = min(self.ceiling, max(self.floor, limit))
+        change = limit - self.limit
+        self.decisions.append({
+            'time': time.time(),
+            'limit': limit,
+            'previous_limit': self.limit,
+            'reason': reason,
+            'throughput': throughput,
+            'latency': latency,
+            'errors': self._errors,
+            'throttled': self._throttled,
+            'active': self.active
+        })
+        
+        self.limit = limit
+        self._last_change = change
+        self._last_throughput = throughput
+        self._reset_window(now)
+        if change > 0:
+            self._condition.notify_all()
+        return change != 0
+    
+    def snapshot(self):
+        """Current limit, usage and the latest decision"""
+        with self._condition:
+            return {
+                'limit': self.limit,
+                'active': self.active,
+                'floor': self.floor,
+                'ceiling': self.ceiling,
+                'last_decision': self.decisions[-1] if self.decisions else None
+            }
+
+
+class AsyncSlots:
+    """Asyncio gate over a ConcurrencyController, waking waiters in FIFO order"""
+    
+    def __init__(self, controller, loop):
+        self.controller = controller
+        self.loop = loop
+        self._waiters = deque()
+        controller.add_listener(self._wake)
+    
+    async def __aenter__(self):
+        if self.controller.try_acquire():
+            return self
+        
+        future = self.loop.create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except BaseException:
+            # A slot may have been handed over just before cancellation
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self._release()
+    
+    def _release(self):
+        self.controller.release()
+        self._wake()
+    
+    def _wake(self):
+        """Hand free slots to waiting coroutines"""
+        while self._waiters and self.controller.try_acquire():
+            future = self._waiters.popleft()
+            if future.cancelled():
+                self.controller.release()
+                continue
+            future.set_result(None)
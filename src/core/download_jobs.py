@@ -0,0 +1,232 @@
+"""
+Download runs and per-file job states kept on disk, so unfinished work survives a restart
+"""
+
+import os
+import json
+import time
+import threading
+from config.settings import DOWNLOAD_JOBS_PATH, DOWNLOAD_JOBS_KEEP_RUNS, JOB_FLUSH_BATCH, JOB_FLUSH_INTERVAL
+from src.utils.lazy_import import lazy_import
+
+sqlite3 = lazy_import("sqlite3")  # loaded when the store is opened
+
+JOB_STATES = ("pending", "active", "done", "failed")
+RUN_COLUMNS = ("id", "download_folder", "sync", "schedule", "checksum_manifest", "status", "created_at", "finished_at")
+
+
+class DownloadJobStore:
+    """SQLite record of download runs and the state of every file in them
+    
+    State changes are buffered and written JOB_FLUSH_BATCH at a time (or
+    after JOB_FLUSH_INTERVAL) in one transaction, so per-file bookkeeping
+    costs no more than a few commits per second however fast files finish.
+    A crash loses at most the last unwritten batch; those files are simply
+    downloaded, or skipped as current, again.
+    """
+    
+    def __init__(self, path=DOWNLOAD_JOBS_PATH, keep_runs=DOWNLOAD_JOBS_KEEP_RUNS,
+                 flush_batch=JOB_FLUSH_BATCH, flush_interval=JOB_FLUSH_INTERVAL):
+        self.path = path
+        self.keep_runs = keep_runs
+        self.flush_batch = flush_batch
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._updates = {}  # (run_id, url) -> columns to write with the next batch
+        self._last_flush = time.monotonic()
+        
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, download_folder TEXT, sync INTEGER, schedule TEXT, "
+            "checksum_manifest TEXT, status TEXT, created_at REAL, finished_at REAL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "run_id INTEGER, url TEXT, name TEXT, relative_path TEXT, size INTEGER, info TEXT, "
+            "state TEXT DEFAULT 'pending', attempts INTEGER DEFAULT 0, bytes_done INTEGER DEFAULT 0, "
+            "error TEXT, status INTEGER, added_at REAL, started_at REAL, finished_at REAL, "
+            "PRIMARY KEY (run_id, url))"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_state ON jobs (run_id, state)"
+        )
+        self._connection.commit()
+    
+    # Runs
+    def create_run(self, download_folder, sync=False, schedule=None, checksum_manifest=None):
+        """Register a new run and drop the oldest runs beyond the limit; returns its id"""
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO runs (download_folder, sync, schedule, checksum_manifest, status, created_at) "
+                "VALUES (?, ?, ?, ?, 'running', ?)",
+                (download_folder, int(bool(sync)), schedule, checksum_manifest, time.time())
+            )
+            run_id = cursor.lastrowid
+            
+            expired = self._connection.execute(
+                "SELECT id FROM runs ORDER BY id DESC LIMIT -1 OFFSET ?", (max(1, self.keep_runs),)
+            ).fetchall()
+            self._connection.executemany("DELETE FROM jobs WHERE run_id = ?", expired)
+            self._connection.executemany("DELETE FROM runs WHERE id = ?", expired)
+            self._connection.commit()
+        return run_id
+    
+    def reopen_run(self, run_id):
+        """Mark an interrupted run as running again"""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE runs SET status = 'running', finished_at = NULL WHERE id = ?", (run_id,)
+            )
+            self._connection.commit()
+    
+    def finish_run(self, run_id, status):
+        """Write buffered changes and close a run; files cut off mid-transfer go back to pending"""
+        with self._lock:
+            self._flush()
+            self._connection.execute(
+                "UPDATE jobs SET state = 'pending' WHERE run_id = ? AND state = 'active'", (run_id,)
+            )
+            self._connection.execute(
+                "UPDATE runs SET status = ?, finished_at = ? WHERE id = ?", (status, time.time(), run_id)
+            )
+            self._connection.commit()
+    
+    def get_run(self, run_id):
+        """A run as a dict, or None"""
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(RUN_COLUMNS)} FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+        return dict(zip(RUN_COLUMNS, row)) if row else None
+    
+    def unfinished_run(self):
+        """The newest run that still has files to download and was not abandoned, or None"""
+        with self._lock:
+            self._flush()
+            row = self._connection.execute(
+                f"SELECT {', '.join(RUN_COLUMNS)} FROM runs WHERE status != 'abandoned' AND EXISTS ("
+                "SELECT 1 FROM jobs WHERE jobs.run_id = runs.id AND state IN ('pending', 'active')"
+                ") ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        return dict(zip(RUN_COLUMNS, row)) if row else None
+    
+    def runs(self, limit=10):
+        """The newest runs, each with the file counts and bytes of its job states"""
+        with self._lock:
+            self._flush()
+            rows = self._connection.execute(
+                f"SELECT {', '.join(RUN_COLUMNS)} FROM runs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        runs = [dict(zip(RUN_COLUMNS, row)) for row in rows]
+        for run in runs:
+            run.update(self.summary(run['id']))
+        return runs
+    
+    # Jobs
+    def add_jobs(self, run_id, files):
+        """Record files of a run as pending; files already in the run keep their state"""
+        now = time.time()
+        rows = [
+            (run_id, file_info["url"], file_info["name"], file_info.get("relative_path", ""),
+             file_info.get("size"), json.dumps(dict(file_info), separators=(",", ":")), now)
+            for file_info in files
+        ]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO jobs (run_id, url, name, relative_path, size, info, added_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._connection.commit()
+    
+    def update(self, run_id, url, **columns):
+        """Buffer new column values for one file's job, e.g. state="done"; written with the next batch"""
+        with self._lock:
+            self._updates.setdefault((run_id, url), {}).update(columns)
+            if len(self._updates) >= self.flush_batch or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+    
+    def flush(self):
+        """Write all buffered changes now"""
+        with self._lock:
+            self._flush()
+    
+    def _flush(self):
+        """Write buffered changes in one transaction, grouped by the columns they set"""
+        if not self._updates:
+            return
+        groups = {}
+        for (run_id, url), columns in self._updates.items():
+            names = tuple(sorted(columns))
+            groups.setdefault(names, []).append(tuple(columns[name] for name in names) + (run_id, url))
+        for names, rows in groups.items():
+            assignments = ", ".join(f"{name} = ?" for name in names)
+            self._connection.executemany(f"UPDATE jobs SET {assignments} WHERE run_id = ? AND url = ?", rows)
+        self._connection.commit()
+        self._updates.clear()
+        self._last_flush = time.monotonic()
+    
+    def pending_files(self, run_id):
+        """(file_info, failed attempts) of every file of a run still to download, in the order they were added"""
+        with self._lock:
+            self._flush()
+            rows = self._connection.execute(
+                "SELECT info, attempts FROM jobs WHERE run_id = ? AND state IN ('pending', 'active') ORDER BY rowid",
+                (run_id,)
+            ).fetchall()
+        return [(json.loads(info), attempts) for info, attempts in rows]
+    
+    def run_files(self, run_id):
+        """file_info of every file of a run whatever its state, in the order they were added"""
+        with self._lock:
+            self._flush()
+            rows = self._connection.execute(
+                "SELECT info FROM jobs WHERE run_id = ? ORDER BY rowid", (run_id,)
+            ).fetchall()
+        return [json.loads(info) for info, in rows]
+    
+    def summary(self, run_id):
+        """File count and bytes per job state of a run, plus bytes transferred"""
+        with self._lock:
+            self._flush()
+            rows = self._connection.execute(
+                "SELECT state, COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(bytes_done), 0) "
+                "FROM jobs WHERE run_id = ? GROUP BY state",
+                (run_id,)
+            ).fetchall()
+        summary = {state: 0 for state in JOB_STATES}
+        summary.update(total_files=0, total_bytes=0, bytes_done=0)
+        for state, files, size, bytes_done in rows:
+            summary[state] = files
+            summary['total_files'] += files
+            summary['total_bytes'] += size
+            summary['bytes_done'] += bytes_done
+        return summary
+    
+    def failures(self, run_id):
+        """Files of a run that failed for good, with their errors and attempt counts"""
+        with self._lock:
+            self._flush()
+            rows = self._connection.execute(
+                "SELECT name, url, relative_path, error, status, attempts FROM jobs "
+                "WHERE run_id = ? AND state = 'failed' ORDER BY finished_at",
+                (run_id,)
+            ).fetchall()
+        return [
+            {"name": name, "url": url, "relative_path": relative_path, "error": error, "status": status,
+             "attempts": attempts}
+            for name, url, relative_path, error, status, attempts in rows
+        ]
+    
+    def close(self):
+        """Write buffered changes and close the database"""
+        with self._lock:
+            self._flush()
+            self._connection.close()
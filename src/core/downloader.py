@@ -2,19 +2,43 @@
 Core downloading functionality with progress tracking
 """
 
+import os
 import time
+import heapq
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from config.settings import MAX_CONCURRENT_DOWNLOADS
-from src.utils.network_utils import NetworkManager
-from src.utils.file_utils import create_safe_path, format_speed
+from itertools import chain, count
+from functools import partial
+from config.settings import (
+    MAX_CONCURRENT_DOWNLOADS, CONCURRENCY_ADAPTIVE, CONCURRENCY_FLOOR, CONCURRENCY_CEILING,
+    DOWNLOAD_SCHEDULE, VERIFY_DOWNLOADS, DOWNLOAD_JOBS_ENABLED
+)
+from src.utils.network_utils import create_network_manager
+from src.utils.download_journal import DownloadJournal, DownloadCancelledError
+from src.utils.file_utils import create_safe_path, format_speed, parse_http_date
+from src.core.sync import SyncManifest, sync_key, listing_file_info
+from src.core.stats import TransferStats, ProgressThrottle
+from src.core.concurrency import ConcurrencyController, AsyncSlots
+from src.core.scheduling import schedule_files
+from src.core.integrity import ChecksumCatalog
+from src.core.download_jobs import DownloadJobStore
+from src.utils.checksums import IntegrityError, StreamDigest, storage_algorithm
+from src.utils.retry import http_status
+from src.utils.lazy_import import lazy_import
+
+asyncio = lazy_import("asyncio")  # only needed by the asyncio backend
+
+RETRY_POLL_INTERVAL = 0.2  # seconds between checks for a stop while waiting for a retry
 
 
 class DownloadManager:
     """Handle file downloading with progress tracking"""
     
-    def __init__(self):
-        self.network_manager = NetworkManager()
+    def __init__(self, network_manager=None, job_store=None):
+        self.network_manager = network_manager or create_network_manager()
+        if job_store is None and DOWNLOAD_JOBS_ENABLED:
+            job_store = DownloadJobStore()
+        self.job_store = job_store
+        self.run_id = None
         self.is_downloading = False
         self.download_stats = {
             'downloaded_bytes': 0,
@@ -22,8 +46,25 @@ class DownloadManager:
             'start_time': 0,
             'current_speed': 0,
             'completed_files': 0,
-            'total_files': 0
+            'total_files': 0,
+            'sync_mode': False,
+            'skipped_files': 0,
+            'skipped_bytes': 0,
+            'concurrency': 0,
+            'schedule': DOWNLOAD_SCHEDULE
         }
+        self.sync = False
+        self.sync_manifest = None
+        self.checksums = None
+        self.pipeline = None
+        self.transfer_stats = TransferStats()
+        self.progress_throttle = ProgressThrottle()
+        self.concurrency = None
+        self.failures = []
+        self._retries = []  # heap of (due time, sequence, file_info) waiting to be retried
+        self._attempts = {}  # file URL -> failed attempts in this run
+        self._sequence = count()
+        self._stats_lock = threading.Lock()
         self.progress_callback = None
         self.error_callback = None
         self.completion_callback = None
@@ -40,112 +81,513 @@ class DownloadManager:
         """Set callback for completion"""
         self.completion_callback = callback
     
-    def start_download(self, files, download_folder):
-        """Start downloading files"""
+    def start_download(self, files, download_folder, sync=False, schedule=DOWNLOAD_SCHEDULE,
+                       listing=None, checksum_manifest=None):
+        """Start downloading files in the order of a scheduling policy; in sync mode skip files already up to date
+        
+        Checksum sidecars are looked up in listing (all scanned files, default: files);
+        checksum_manifest is an optional local sha256sum-style file.
+        """
+        checksum_sources = files if listing is None else listing
+        self._begin_run(download_folder, sync, schedule, checksum_manifest)
+        self._start_files(files, download_folder, schedule, checksum_sources, checksum_manifest)
+    
+    def resume_download(self, run_id=None):
+        """Continue the files left over by an interrupted run (default: the newest one); returns False if there are none"""
+        if self.job_store is None:
+            return False
+        run = self.job_store.get_run(run_id) if run_id is not None else self.job_store.unfinished_run()
+        jobs = self.job_store.pending_files(run['id']) if run else []
+        if not jobs:
+            return False
+        
+        files = [file_info for file_info, _ in jobs]
+        self._begin_run(run['download_folder'], bool(run['sync']), run['schedule'], run['checksum_manifest'], run['id'])
+        self._attempts = {file_info["url"]: attempts for file_info, attempts in jobs}
+        # Checksum sidecars may belong to files that already finished
+        checksum_sources = self.job_store.run_files(run['id'])
+        self._start_files(files, run['download_folder'], run['schedule'], checksum_sources, run['checksum_manifest'], record=False)
+        return True
+    
+    def _start_files(self, files, download_folder, schedule, checksum_sources, checksum_manifest, record=True):
+        """Download a known list of files on a background thread, recording them as jobs first unless they already are"""
+        files = schedule_files(files, schedule)
+        self.download_stats['total_files'] = len(files)
+        self.download_stats['total_bytes'] = sum(file_info.get("size", 0) for file_info in files)
+        
+        def download_thread():
+            if record and self.job_store:
+                self.job_store.add_jobs(self.run_id, files)
+            self.checksums = ChecksumCatalog(checksum_sources, checksum_manifest) if VERIFY_DOWNLOADS else None
+            self._download_files(iter([files]), download_folder)
+        
+        threading.Thread(target=download_thread, daemon=True).start()
+    
+    def start_pipeline(self, pipeline, download_folder, sync=False, schedule=DOWNLOAD_SCHEDULE, checksum_manifest=None):
+        """Download files while a running scan feeds them into a FilePipeline
+        
+        Call before the scan starts so that no checksum sidecar is missed;
+        each batch taken from the pipeline is ordered by the scheduling policy.
+        """
+        self._begin_run(download_folder, sync, schedule, checksum_manifest)
+        self.pipeline = pipeline
+        self.checksums = ChecksumCatalog(manifest_path=checksum_manifest) if VERIFY_DOWNLOADS else None
+        if self.checksums:
+            pipeline.add_listener(self.checksums.add_listing)
+        if self.job_store:
+            # Recorded on discovery, so files still queued when a run stops can be resumed
+            pipeline.add_listener(partial(self.job_store.add_jobs, self.run_id), kept_only=True)
+        
+        batches = self._pipeline_batches(pipeline, schedule)
+        threading.Thread(target=self._download_files, args=(batches, download_folder), daemon=True).start()
+    
+    def _begin_run(self, download_folder, sync, schedule, checksum_manifest=None, run_id=None):
+        """Reset state and statistics for a new download run, or for resuming the stored run run_id"""
+        if self.job_store:
+            if run_id is None:
+                run_id = self.job_store.create_run(download_folder, sync, schedule, checksum_manifest)
+            else:
+                self.job_store.reopen_run(run_id)
+        self.run_id = run_id
         self.is_downloading = True
+        self.pipeline = None
+        self.sync = sync
+        # Every run records what it downloaded, so a later sync can skip it
+        self.sync_manifest = SyncManifest(download_folder)
+        self.transfer_stats = TransferStats()
+        self.progress_throttle = ProgressThrottle()
         self.download_stats = {
             'downloaded_bytes': 0,
-            'total_bytes': 0,
             'start_time': time.time(),
             'current_speed': 0,
             'completed_files': 0,
-            'total_files': len(files)
+            'total_files': 0,
+            'total_bytes': 0,
+            'sync_mode': sync,
+            'skipped_files': 0,
+            'skipped_bytes': 0,
+            'concurrency': 0,
+            'schedule': schedule
         }
-        
-        def download_thread():
-            self._download_files(files, download_folder)
-        
-        threading.Thread(target=download_thread, daemon=True).start()
+        self.concurrency = self._create_concurrency_controller()
+        self.failures = []
+        self._retries = []
+        self._attempts = {}
+        self.network_manager.retry.reset()
+    
+    def _pipeline_batches(self, pipeline, schedule):
+        """Yield scheduled batches of files as the scan discovers them, growing the totals"""
+        while self.is_downloading:
+            batch = pipeline.get_batch(self.concurrency.ceiling)
+            if not batch:
+                return
+            with self._stats_lock:
+                self.download_stats['total_files'] += len(batch)
+                self.download_stats['total_bytes'] += sum(file_info.get("size", 0) for file_info in batch)
+            yield schedule_files(batch, schedule)
     
     def stop_download(self):
         """Stop downloading"""
         self.is_downloading = False
+        if self.pipeline:
+            self.pipeline.cancel()
+    
+    def _create_concurrency_controller(self):
+        """Create the transfer limit controller for one download run"""
+        if self.network_manager.is_async:
+            ceiling = self.network_manager.max_in_flight
+        else:
+            ceiling = CONCURRENCY_CEILING
+        if not CONCURRENCY_ADAPTIVE:
+            ceiling = MAX_CONCURRENT_DOWNLOADS
+        floor = CONCURRENCY_FLOOR if CONCURRENCY_ADAPTIVE else MAX_CONCURRENT_DOWNLOADS
+        return ConcurrencyController(MAX_CONCURRENT_DOWNLOADS, floor, ceiling, self.transfer_stats.total)
+    
+    def set_bandwidth_limit(self, rate, host=None):
+        """Limit download bandwidth in bytes per second, globally or for one host; 0 removes the limit"""
+        if host:
+            self.network_manager.bandwidth.set_host_limit(host, rate)
+        else:
+            self.network_manager.bandwidth.set_global_limit(rate)
     
-    def _download_files(self, files, download_folder):
+    def get_concurrency_decisions(self):
+        """Recent concurrency adjustments with the measurements behind them"""
+        return list(self.concurrency.decisions) if self.concurrency else []
+    
+    def _download_files(self, batches, download_folder):
+        """Download batches of files on the configured network backend, then retry the failed ones"""
+        batches = self._with_due_retries(batches)
+        while batches is not None:
+            if self.network_manager.is_async:
+                asyncio.run(self._download_files_async(batches, download_folder))
+            else:
+                self._download_files_threaded(batches, download_folder)
+            batches = self._next_retry_round()
+        
+        if self.sync_manifest:
+            self.sync_manifest.save()
+        if self.job_store:
+            # Files still queued for a retry when the run was stopped stay pending
+            self.job_store.finish_run(self.run_id, "finished" if self.is_downloading else "stopped")
+        
+        # Final, unthrottled progress event
+        if self.progress_callback and self.download_stats['completed_files']:
+            self._emit_progress("", 1.0)
+        
+        # Download completed
+        if self.completion_callback:
+            self.completion_callback()
+    
+    def _with_due_retries(self, batches):
+        """Yield the batches, slipping in failed files whose retry time has come"""
+        for batch in batches:
+            yield batch
+            due = self._due_retries()
+            if due:
+                yield due
+    
+    def _due_retries(self):
+        """Take the queued retries that are due"""
+        now = time.monotonic()
+        with self._stats_lock:
+            due = []
+            while self._retries and self._retries[0][0] <= now:
+                due.append(heapq.heappop(self._retries)[2])
+            return due
+    
+    def _next_retry_round(self):
+        """Wait for the earliest queued retry; returns batches for another round, or None when none are left"""
+        while self.is_downloading:
+            with self._stats_lock:
+                if not self._retries:
+                    return None
+                wait = self._retries[0][0] - time.monotonic()
+            if wait <= 0:
+                return self._with_due_retries(iter([self._due_retries()]))
+            time.sleep(min(wait, RETRY_POLL_INTERVAL))
+        return None
+    
+    def _download_files_threaded(self, batches, download_folder):
         """Download files with thread pool"""
         def download_single_file(file_info):
             if not self.is_downloading:
                 return False
             
-            try:
-                url = file_info["url"]
-                filename = file_info["name"]
-                relative_path = file_info["relative_path"]
-                
-                # Create safe file path
-                local_path = create_safe_path(download_folder, relative_path, filename)
+            with self.concurrency:
+                if not self.is_downloading:
+                    return False
                 
-                # Progress callback for this file
-                def file_progress(downloaded, total_size):
-                    if not self.is_downloading:
-                        return
+                try:
+                    wait = self.network_manager.retry.host_wait(file_info["url"])
+                    if wait:
+                        self._retry_later(file_info, wait)
+                        return False
+                    self._update_job(file_info, state="active", started_at=time.time())
                     
-                    # Update stats
-                    self.download_stats['downloaded_bytes'] += downloaded - getattr(file_progress, 'last_downloaded', 0)
-                    file_progress.last_downloaded = downloaded
+                    local_path, file_progress = self._prepare_file(file_info, download_folder)
                     
-                    # Calculate speed
-                    elapsed_time = time.time() - self.download_stats['start_time']
-                    if elapsed_time > 0:
-                        self.download_stats['current_speed'] = self.download_stats['downloaded_bytes'] / elapsed_time
+                    checksum, sidecar_url = self.checksums.lookup(file_info) if self.checksums else (None, None)
+                    if sidecar_url:
+                        try:
+                            text = self.network_manager.get_page_content(sidecar_url)
+                            checksum = self.checksums.add_sidecar(sidecar_url, text, file_info)
+                        except Exception:
+                            checksum = None
                     
-                    # Update progress
-                    if self.progress_callback:
-                        progress_data = {
-                            'current_file': filename,
-                            'file_progress': downloaded / total_size if total_size > 0 else 0,
-                            'overall_progress': self.download_stats['completed_files'] / self.download_stats['total_files'],
-                            'speed': format_speed(self.download_stats['current_speed']),
-                            'downloaded_mb': self.download_stats['downloaded_bytes'] / (1024 * 1024)
-                        }
-                        self.progress_callback(progress_data)
-                
-                # Download file
-                self.network_manager.download_file_stream(url, local_path, file_progress)
-                return True
+                    remote = None
+                    if self.sync:
+                        remote = listing_file_info(file_info)
+                        if remote is None:
+                            try:
+                                remote = self.network_manager.get_file_info(file_info["url"])
+                            except Exception:
+                                remote = None
+                        if self._skip_if_current(file_info, local_path, remote, checksum):
+                            return True
+                    
+                    digest = self._new_digest(checksum)
+                    downloaded = self.network_manager.download_file_stream(
+                        file_info["url"], local_path, file_progress, self._should_stop, digest
+                    )
+                    self.network_manager.retry.record_success(file_info["url"])
+                    downloaded = self._verify(local_path, downloaded, digest, checksum)
+                    self._record_synced(file_info, local_path, downloaded)
+                    self._update_job(file_info, state="done", bytes_done=downloaded['size'], finished_at=time.time())
+                    return True
                 
+                except DownloadCancelledError:
+                    return False
+                except Exception as e:
+                    self._file_failed(file_info, e)
+                    return False
+        
+        submitted = threading.Semaphore(self.concurrency.ceiling)
+        
+        def file_done(file_info, future):
+            submitted.release()
+            try:
+                if future.result() and self.is_downloading:
+                    self._complete_file(file_info)
             except Exception as e:
                 if self.error_callback:
-                    self.error_callback(f"Lỗi tải {filename}: {str(e)}")
-                return False
+                    self.error_callback(f"Lỗi xử lý {file_info['name']}: {str(e)}")
         
-        # Download with thread pool
-        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS) as executor:
-            future_to_file = {
-                executor.submit(download_single_file, file_info): file_info 
-                for file_info in files
-            }
-            
-            for future in as_completed(future_to_file):
+        # Download with a thread pool sized to the ceiling; the controller
+        # decides how many of the workers transfer at once. Submitting no
+        # more files than workers leaves the backlog with the file source.
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=self.concurrency.ceiling) as executor:
+            for file_info in chain.from_iterable(batches):
+                submitted.acquire()
                 if not self.is_downloading:
                     break
+                future = executor.submit(download_single_file, file_info)
+                future.add_done_callback(partial(file_done, file_info))
+    
+    async def _download_files_async(self, batches, download_folder):
+        """Download files concurrently on one event loop"""
+        loop = asyncio.get_running_loop()
+        slots = AsyncSlots(self.concurrency, loop)
+        
+        async def download_single_file(file_info):
+            async with slots:
+                if not self.is_downloading:
+                    return
                 
-                file_info = future_to_file[future]
                 try:
-                    success = future.result()
-                    if success:
-                        self.download_stats['completed_files'] += 1
-                        
-                        # Update overall progress
-                        if self.progress_callback:
-                            overall_progress = self.download_stats['completed_files'] / self.download_stats['total_files']
-                            progress_data = {
-                                'current_file': file_info["name"],
-                                'file_progress': 1.0,
-                                'overall_progress': overall_progress,
-                                'speed': format_speed(self.download_stats['current_speed']),
-                                'downloaded_mb': self.download_stats['downloaded_bytes'] / (1024 * 1024)
-                            }
-                            self.progress_callback(progress_data)
-                            
+                    wait = self.network_manager.retry.host_wait(file_info["url"])
+                    if wait:
+                        self._retry_later(file_info, wait)
+                        return
+                    self._update_job(file_info, state="active", started_at=time.time())
+                    
+                    local_path, file_progress = self._prepare_file(file_info, download_folder)
+                    
+                    checksum, sidecar_url = self.checksums.lookup(file_info) if self.checksums else (None, None)
+                    if sidecar_url:
+                        try:
+                            text = await self.network_manager.get_page_content(sidecar_url)
+                            checksum = self.checksums.add_sidecar(sidecar_url, text, file_info)
+                        except Exception:
+                            checksum = None
+                    
+                    remote = None
+                    if self.sync:
+                        remote = listing_file_info(file_info)
+                        if remote is None:
+                            try:
+                                remote = await self.network_manager.get_file_info(file_info["url"])
+                            except Exception:
+                                remote = None
+                    
+                    if not self._skip_if_current(file_info, local_path, remote, checksum):
+                        digest = self._new_digest(checksum)
+                        downloaded = await self.network_manager.download_file_stream(
+                            file_info["url"], local_path, file_progress, self._should_stop, digest
+                        )
+                        self.network_manager.retry.record_success(file_info["url"])
+                        downloaded = self._verify(local_path, downloaded, digest, checksum)
+                        self._record_synced(file_info, local_path, downloaded)
+                        self._update_job(file_info, state="done", bytes_done=downloaded['size'], finished_at=time.time())
+                except DownloadCancelledError:
+                    return
                 except Exception as e:
-                    if self.error_callback:
-                        self.error_callback(f"Lỗi xử lý {file_info['name']}: {str(e)}")
+                    self._file_failed(file_info, e)
+                    return
+                
+                if self.is_downloading:
+                    self._complete_file(file_info)
         
-        # Download completed
-        if self.completion_callback:
-            self.completion_callback()
+        async with self.network_manager:
+            tasks = set()
+            while True:
+                # Waiting for the next batch may block on a running scan
+                batch = await loop.run_in_executor(None, next, batches, None)
+                if batch is None:
+                    break
+                for file_info in batch:
+                    task = asyncio.ensure_future(download_single_file(file_info))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                while len(tasks) >= self.concurrency.ceiling:
+                    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            await asyncio.gather(*tasks)
+    
+    def _skip_if_current(self, file_info, local_path, remote, checksum=None):
+        """In sync mode, skip a file whose local copy matches the remote one"""
+        if not self.sync or not remote:
+            return False
+        
+        if checksum:
+            remote = dict(remote, checksum=checksum)
+        key = sync_key(file_info)
+        if not self.sync_manifest.is_up_to_date(key, local_path, remote):
+            return False
+        
+        self.sync_manifest.update(key, remote)
+        with self._stats_lock:
+            self.download_stats['skipped_files'] += 1
+            self.download_stats['skipped_bytes'] += remote.get('size') or os.path.getsize(local_path)
+        self._update_job(file_info, state="done", finished_at=time.time())
+        return True
+    
+    def _new_digest(self, checksum):
+        """Hashes to compute while downloading: the stored one plus the published one"""
+        if not VERIFY_DOWNLOADS:
+            return None
+        algorithms = {storage_algorithm()}
+        if checksum:
+            algorithms.add(checksum[0])
+        return StreamDigest(algorithms)
+    
+    def _verify(self, local_path, downloaded, digest, checksum):
+        """Check a finished download against its published checksum; returns its info with the digests"""
+        if digest is None:
+            return dict(downloaded, hashes={})
+        
+        hashes = digest.finish(local_path, downloaded['size'])
+        if checksum and hashes[checksum[0]] != checksum[1]:
+            # Keep no corrupt copy; the retry starts from byte zero
+            try:
+                os.remove(local_path)
+            except OSError:
+                pass
+            raise IntegrityError(f"Checksum mismatch ({checksum[0]})")
+        return dict(downloaded, hashes=hashes)
+    
+    def _record_synced(self, file_info, local_path, remote):
+        """Remember the size, validators and verified hashes of a freshly downloaded file"""
+        if not remote:
+            return
+        
+        self.sync_manifest.update(sync_key(file_info), dict(remote, modified=file_info.get("modified")))
+        
+        # Match the remote mtime so size/date checks work without the manifest
+        remote_mtime = parse_http_date(remote.get('last_modified'))
+        if remote_mtime is not None:
+            os.utime(local_path, (remote_mtime, remote_mtime))
+    
+    def _should_stop(self):
+        """Tell the network layer to abandon transfers, keeping partial data"""
+        return not self.is_downloading
+    
+    def _prepare_file(self, file_info, download_folder):
+        """Create the local path and progress callback for one file"""
+        filename = file_info["name"]
+        
+        # Create safe file path
+        local_path = create_safe_path(download_folder, file_info["relative_path"], filename)
+        
+        # Progress callback for this file; counting is lock-free and
+        # progress events are coalesced to PROGRESS_UPDATE_HZ
+        def file_progress(downloaded, total_size):
+            if not self.is_downloading:
+                return
+            
+            if file_progress.started is not None:
+                self.concurrency.record_latency(time.monotonic() - file_progress.started)
+                file_progress.started = None
+            
+            if downloaded < file_progress.last_downloaded:
+                file_progress.last_downloaded = 0  # partial data was discarded; counting restarts
+            self.transfer_stats.add(downloaded - file_progress.last_downloaded)
+            file_progress.last_downloaded = downloaded
+            self.concurrency.maybe_update()
+            
+            if self.progress_callback and self.progress_throttle.ready():
+                self._emit_progress(filename, downloaded / total_size if total_size > 0 else 0)
+        
+        # Bytes kept in a .part file from an earlier run are reported but not transferred now
+        journal = DownloadJournal.load(local_path)
+        file_progress.last_downloaded = journal.completed_bytes() if journal else 0
+        file_progress.started = time.monotonic()
+        return local_path, file_progress
+    
+    def _file_failed(self, file_info, error):
+        """Queue a failed file for another try, or report it once it is given up"""
+        self.concurrency.record_error(http_status(error))
+        url = file_info["url"]
+        with self._stats_lock:
+            attempt = self._attempts.get(url, 0)
+            self._attempts[url] = attempt + 1
+        
+        delay = self.network_manager.retry.record_failure(url, error, attempt)
+        self._update_job(
+            file_info, state="pending" if delay is not None else "failed", attempts=attempt + 1,
+            error=str(error), status=http_status(error), finished_at=None if delay is not None else time.time()
+        )
+        if delay is not None:
+            self._retry_later(file_info, delay)
+            return
+        
+        with self._stats_lock:
+            self.failures.append({
+                "name": file_info["name"],
+                "url": url,
+                "relative_path": file_info["relative_path"],
+                "error": str(error),
+                "status": http_status(error),
+                "attempts": attempt + 1
+            })
+        if self.error_callback:
+            self.error_callback(f"Lỗi tải {file_info['name']} ({attempt + 1} lần thử): {str(error)}")
+    
+    def _retry_later(self, file_info, delay):
+        """Queue a file to be downloaded again after delay seconds"""
+        with self._stats_lock:
+            heapq.heappush(self._retries, (time.monotonic() + delay, next(self._sequence), file_info))
+    
+    def _update_job(self, file_info, **columns):
+        """Record a state change of one file in the job store"""
+        if self.job_store:
+            self.job_store.update(self.run_id, file_info["url"], **columns)
+    
+    def get_failure_report(self):
+        """Files of the last run that failed for good, with their errors and attempt counts"""
+        if self.job_store and self.run_id is not None:
+            return self.job_store.failures(self.run_id)
+        with self._stats_lock:
+            return list(self.failures)
+    
+    def get_job_summary(self, run_id=None):
+        """File counts per job state of a stored run (default: the last one), or None without a job store"""
+        run_id = self.run_id if run_id is None else run_id
+        if self.job_store is None or run_id is None:
+            return None
+        return self.job_store.summary(run_id)
+    
+    def _complete_file(self, file_info):
+        """Record a finished file and update overall progress"""
+        with self._stats_lock:
+            self.download_stats['completed_files'] += 1
+        self.concurrency.record_success()
+        
+        if self.progress_callback and self.progress_throttle.ready():
+            self._emit_progress(file_info["name"], 1.0)
+    
+    def _merge_stats(self):
+        """Fold the per-worker counters into download_stats"""
+        downloaded_bytes, speed = self.transfer_stats.sample()
+        self.download_stats['downloaded_bytes'] = downloaded_bytes
+        self.download_stats['current_speed'] = speed
+        if self.concurrency:
+            self.download_stats['concurrency'] = self.concurrency.limit
+    
+    def _emit_progress(self, current_file, file_progress):
+        """Send one coalesced progress event"""
+        self._merge_stats()
+        total_files = self.download_stats['total_files']
+        progress_data = {
+            'current_file': current_file,
+            'file_progress': file_progress,
+            'overall_progress': self.download_stats['completed_files'] / total_files if total_files else 1.0,
+            'speed': format_speed(self.download_stats['current_speed']),
+            'downloaded_mb': self.download_stats['downloaded_bytes'] / (1024 * 1024),
+            'concurrency': self.download_stats['concurrency']
+        }
+        self.progress_callback(progress_data)
     
     def get_download_stats(self):
         """Get current download statistics"""
+        self._merge_stats()
         return self.download_stats.copy()
@@ -0,0 +1,188 @@
+"""
+Compact columnar index of scanned files
+"""
+
+import os
+import math
+from array import array
+from collections.abc import Mapping, Sequence
+
+
+class FileEntry(Mapping):
+    """Read-only dict-like view of one indexed file"""
+    
+    __slots__ = ("index", "position")
+    
+    def __init__(self, index, position):
+        self.index = index
+        self.position = position
+    
+    def __getitem__(self, key):
+        value = self.index.field(self.position, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+    
+    def __iter__(self):
+        return (key for key in self.index.FIELDS if self.index.field(self.position, key) is not None)
+    
+    def __len__(self):
+        return sum(1 for _ in self)
+    
+    def __repr__(self):
+        return f"FileEntry({dict(self)!r})"
+
+
+class FileIndex(Sequence):
+    """Scanned files stored as parallel columns with interned folders and lazy URLs"""
+    
+    FIELDS = ("name", "url", "href", "relative_path", "full_path",
+              "size", "size_exact", "modified", "etag", "last_modified")
+    
+    def __init__(self):
+        # Folder table
+        self.folder_paths = []
+        self.folder_bases = []  # URL prefix that file names are appended to
+        self.folder_ids = {}
+        
+        # File columns
+        self.names = []
+        self.folders = array("I")
+        self.sizes = array("q")  # -1 when unknown
+        self.modified = array("d")  # NaN when unknown
+        self.size_exact = bytearray()
+        self.extras = {}  # position -> fields that rarely differ from the defaults
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [FileEntry(self, i) for i in range(*position.indices(len(self.names)))]
+        if position < 0:
+            position += len(self.names)
+        if not 0 <= position < len(self.names):
+            raise IndexError("file index out of range")
+        return FileEntry(self, position)
+    
+    def folder_id(self, relative_path, url):
+        """Intern a folder and return its id"""
+        folder_id = self.folder_ids.get(relative_path)
+        if folder_id is None:
+            folder_id = len(self.folder_paths)
+            self.folder_ids[relative_path] = folder_id
+            self.folder_paths.append(relative_path)
+            self.folder_bases.append(url[:url.rfind("/") + 1])
+        return folder_id
+    
+    def add_files(self, relative_path, url, files):
+        """Append parsed listing files of the folder at url; returns the first new position"""
+        folder_id = self.folder_id(relative_path, url)
+        base = self.folder_bases[folder_id]
+        start = len(self.names)
+        
+        for file_info in files:
+            position = len(self.names)
+            name = file_info["name"]
+            self.names.append(name)
+            self.folders.append(folder_id)
+            size = file_info.get("size")
+            self.sizes.append(-1 if size is None else size)
+            self.modified.append(file_info.get("modified") or math.nan)
+            self.size_exact.append(1 if file_info.get("size_exact") else 0)
+            
+            extra = {}
+            if file_info["url"] != base + name:
+                extra["url"] = file_info["url"]
+            if file_info.get("href", name) != name:
+                extra["href"] = file_info["href"]
+            for key in ("etag", "last_modified"):
+                if file_info.get(key):
+                    extra[key] = file_info[key]
+            if extra:
+                self.extras[position] = extra
+        return start
+    
+    def set_info(self, position, size=None, size_exact=None, etag=None, last_modified=None):
+        """Store size and validators learned after the scan"""
+        if size is not None:
+            self.sizes[position] = size
+        if size_exact is not None:
+            self.size_exact[position] = 1 if size_exact else 0
+        
+        validators = {key: value for key, value in (("etag", etag), ("last_modified", last_modified)) if value}
+        if validators:
+            self.extras.setdefault(position, {}).update(validators)
+    
+    def to_columns(self):
+        """Export the index as plain columns: string lists, array bytes and the extras dict"""
+        return {
+            "folder_paths": list(self.folder_paths),
+            "folder_bases": list(self.folder_bases),
+            "names": list(self.names),
+            "folders": self.folders.tobytes(),
+            "sizes": self.sizes.tobytes(),
+            "modified": self.modified.tobytes(),
+            "size_exact": bytes(self.size_exact),
+            "extras": {position: dict(extra) for position, extra in self.extras.items()}
+        }
+    
+    @classmethod
+    def from_columns(cls, columns):
+        """Rebuild an index exported by to_columns()"""
+        index = cls()
+        index.folder_paths = list(columns["folder_paths"])
+        index.folder_bases = list(columns["folder_bases"])
+        index.folder_ids = {path: folder_id for folder_id, path in enumerate(index.folder_paths)}
+        index.names = list(columns["names"])
+        index.folders.frombytes(columns["folders"])
+        index.sizes.frombytes(columns["sizes"])
+        index.modified.frombytes(columns["modified"])
+        index.size_exact = bytearray(columns["size_exact"])
+        index.extras = {int(position): extra for position, extra in columns["extras"].items()}
+        return index
+    
+    def has_size(self, position):
+        return self.sizes[position] >= 0
+    
+    def positions_missing_size(self):
+        """Positions of files whose size is unknown"""
+        return [position for position, size in enumerate(self.sizes) if size < 0]
+    
+    def url(self, position):
+        """Full URL of a file, built from its folder base unless stored explicitly"""
+        extra = self.extras.get(position)
+        if extra and "url" in extra:
+            return extra["url"]
+        return self.folder_bases[self.folders[position]] + self.names[position]
+    
+    def relative_path(self, position):
+        return self.folder_paths[self.folders[position]]
+    
+    def field(self, position, key):
+        """Value of one field, or None when the file does not have it"""
+        if key == "name":
+            return self.names[position]
+        if key == "url":
+            return self.url(position)
+        if key == "relative_path":
+            return self.relative_path(position)
+        if key == "full_path":
+            relative_path = self.relative_path(position)
+            name = self.names[position]
+            return os.path.join(relative_path, name) if relative_path else name
+        if key == "size":
+            size = self.sizes[position]
+            return size if size >= 0 else None
+        if key == "size_exact":
+            return bool(self.size_exact[position]) if self.sizes[position] >= 0 else None
+        if key == "modified":
+            modified = self.modified[position]
+            return None if math.isnan(modified) else modified
+        
+        extra = self.extras.get(position)
+        if key == "href":
+            return extra.get("href", self.names[position]) if extra else self.names[position]
+        if key in ("etag", "last_modified"):
+            return extra.get(key) if extra else None
+        return None
@@ -0,0 +1,79 @@
+"""
+Expected checksums of downloads from sidecar files on the mirror or a checksum manifest
+"""
+
+import hashlib
+import threading
+from config.settings import CHECKSUM_SIDECAR_SUFFIXES
+from src.core.sync import sync_key
+from src.utils.checksums import parse_checksum_text
+
+
+def supported(checksum):
+    """Keep a (algorithm, digest) pair only if hashlib can compute it"""
+    if checksum and checksum[0] in hashlib.algorithms_available:
+        return checksum
+    return None
+
+
+class ChecksumCatalog:
+    """Find the published checksum of each file to verify downloads against"""
+    
+    def __init__(self, listing=(), manifest_path=None):
+        self.manifest = {}
+        self.sidecars = {}  # sync key of a file -> (suffix rank, URL of its checksum file)
+        self._fetched = {}  # sidecar URL -> parsed checksums
+        self._lock = threading.Lock()
+        self.add_listing(listing)
+        
+        if manifest_path:
+            with open(manifest_path, 'r', encoding='utf-8', errors='replace') as file:
+                self.manifest = parse_checksum_text(file.read())
+    
+    def add_listing(self, files):
+        """Register the checksum sidecars among scanned files"""
+        for file_info in files:
+            name = file_info["name"]
+            for rank, suffix in enumerate(CHECKSUM_SIDECAR_SUFFIXES):
+                if name.endswith(suffix) and len(name) > len(suffix):
+                    key = sync_key({"relative_path": file_info["relative_path"], "name": name[:-len(suffix)]})
+                    # Prefer the suffix listed first (the stronger hash)
+                    with self._lock:
+                        if key not in self.sidecars or rank < self.sidecars[key][0]:
+                            self.sidecars[key] = (rank, file_info["url"])
+    
+    def lookup(self, file_info):
+        """Checksum known without a request, or the URL of a sidecar to fetch; returns (checksum, url)"""
+        key = sync_key(file_info)
+        checksum = supported(self.manifest.get(key))
+        if checksum:
+            return checksum, None
+        
+        sidecar = self.sidecars.get(key)
+        if sidecar is None:
+            return None, None
+        url = sidecar[1]
+        with self._lock:
+            if url in self._fetched:
+                return self._pick(self._fetched[url], file_info["name"]), None
+        return None, url
+    
+    def add_sidecar(self, url, text, file_info):
+        """Parse a fetched sidecar and return the checksum it holds for file_info"""
+        checksums = parse_checksum_text(text)
+        with self._lock:
+            self._fetched[url] = checksums
+        return self._pick(checksums, file_info["name"])
+    
+    @staticmethod
+    def _pick(checksums, name):
+        """Entry for name, a bare digest, or the only entry of a sidecar"""
+        for path, checksum in checksums.items():
+            if path.replace("\\", "/").rsplit("/", 1)[-1] == name:
+                return supported(checksum)
+        if "" in checksums:
+            return supported(checksums[""])
+        if len(checksums) == 1:
+            return supported(next(iter(checksums.values())))
+        return None
+
@@ -0,0 +1,102 @@
+"""
+Streaming hand-off of scanned files to the downloader while the crawl is still running
+"""
+
+import fnmatch
+import threading
+from collections import deque
+from config.settings import PIPELINE_QUEUE_SIZE
+from src.core.sync import sync_key
+
+
+def glob_filter(include=(), exclude=()):
+    """Keep files whose relative path matches any include pattern and no exclude pattern"""
+    include = tuple(include)
+    exclude = tuple(exclude)
+    
+    def keep(file_info):
+        path = sync_key(file_info)
+        if include and not any(fnmatch.fnmatch(path, pattern) for pattern in include):
+            return False
+        return not any(fnmatch.fnmatch(path, pattern) for pattern in exclude)
+    
+    return keep
+
+
+def combine_filters(*filters):
+    """Keep files accepted by every filter; None entries are ignored, and no filters give None"""
+    filters = [file_filter for file_filter in filters if file_filter is not None]
+    if len(filters) < 2:
+        return filters[0] if filters else None
+    
+    def keep(file_info):
+        return all(file_filter(file_info) for file_filter in filters)
+    
+    return keep
+
+
+class FilePipeline:
+    """Bounded queue of discovered files between a scan and the download workers
+    
+    The scanner blocks in put() while the queue is full, so the crawl never
+    runs more than `capacity` files ahead of the downloads.
+    """
+    
+    def __init__(self, capacity=PIPELINE_QUEUE_SIZE, file_filter=None):
+        self.capacity = max(1, capacity)
+        self.file_filter = file_filter
+        self.discovered = 0
+        self.filtered = 0
+        self.closed = False
+        self.cancelled = False
+        self._items = deque()
+        self._condition = threading.Condition()
+        self._listeners = []
+    
+    def add_listener(self, callback, kept_only=False):
+        """Call callback(files) with every discovered batch, before filtering unless kept_only"""
+        self._listeners.append((callback, kept_only))
+    
+    def put(self, files):
+        """Queue a listing's files, waiting while the queue is full; returns False once cancelled"""
+        for callback, kept_only in self._listeners:
+            if not kept_only:
+                callback(files)
+        kept = [file_info for file_info in files if self.file_filter is None or self.file_filter(file_info)]
+        for callback, kept_only in self._listeners:
+            if kept_only and kept:
+                callback(kept)
+        
+        with self._condition:
+            self.discovered += len(files)
+            self.filtered += len(files) - len(kept)
+            for file_info in kept:
+                self._condition.wait_for(lambda: len(self._items) < self.capacity or self.cancelled)
+                if self.cancelled:
+                    return False
+                self._items.append(file_info)
+                self._condition.notify_all()
+            return not self.cancelled
+    
+    def close(self):
+        """Mark the scan as finished; consumers drain what is left"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+    
+    def cancel(self):
+        """Stop consuming: drop queued files and release a blocked scanner"""
+        with self._condition:
+            self.cancelled = True
+            self._items.clear()
+            self._condition.notify_all()
+    
+    def get_batch(self, limit):
+        """Wait for files and take up to limit of them; an empty batch means the pipeline is finished"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._items or self.closed or self.cancelled)
+            if self.cancelled:
+                return []
+            batch = [self._items.popleft() for _ in range(min(limit, len(self._items)))]
+            self._condition.notify_all()
+            return batch
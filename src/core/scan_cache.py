@@ -0,0 +1,127 @@
+"""
+Persistent cache of parsed directory listings
+"""
+
+import os
+import json
+import time
+import threading
+from config.settings import SCAN_CACHE_PATH, SCAN_CACHE_MAX_AGE, SCAN_CACHE_MAX_BYTES
+from src.utils.lazy_import import lazy_import
+
+sqlite3 = lazy_import("sqlite3")  # loaded when the cache is opened
+
+
+class ScanCache:
+    """SQLite-backed listing cache keyed by URL with LRU eviction"""
+    
+    def __init__(self, path=SCAN_CACHE_PATH, max_bytes=SCAN_CACHE_MAX_BYTES, max_age=SCAN_CACHE_MAX_AGE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS listings ("
+            "url TEXT PRIMARY KEY, folders TEXT, files TEXT, etag TEXT, "
+            "last_modified TEXT, fetched_at REAL, last_access REAL, size INTEGER)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS listings_last_access ON listings (last_access)"
+        )
+        self._connection.commit()
+        self._total_bytes = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM listings"
+        ).fetchone()[0]
+    
+    def get(self, url):
+        """Get a cached listing as a dict and mark it recently used, or None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT folders, files, etag, last_modified, fetched_at FROM listings WHERE url = ?",
+                (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE listings SET last_access = ? WHERE url = ?", (time.time(), url)
+            )
+            self._connection.commit()
+        
+        folders, files, etag, last_modified, fetched_at = row
+        return {
+            'folders': json.loads(folders),
+            'files': json.loads(files),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': fetched_at
+        }
+    
+    def is_fresh(self, entry):
+        """Check whether a cached listing can be used without revalidation"""
+        return time.time() - entry['fetched_at'] < self.max_age
+    
+    def put(self, url, folders, files, etag=None, last_modified=None):
+        """Store a parsed listing and evict old entries beyond the size limit"""
+        folders_json = json.dumps(folders)
+        files_json = json.dumps(files)
+        size = len(folders_json) + len(files_json)
+        now = time.time()
+        
+        with self._lock:
+            previous = self._connection.execute(
+                "SELECT size FROM listings WHERE url = ?", (url,)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, folders_json, files_json, etag, last_modified, now, now, size)
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self._evict()
+            self._connection.commit()
+    
+    def touch(self, url):
+        """Mark a listing as revalidated and recently used"""
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "UPDATE listings SET fetched_at = ?, last_access = ? WHERE url = ?",
+                (now, now, url)
+            )
+            self._connection.commit()
+    
+    def _evict(self):
+        """Drop least recently used listings until under the size limit"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        
+        target = self.max_bytes * 0.9
+        rows = self._connection.execute(
+            "SELECT url, size FROM listings ORDER BY last_access"
+        ).fetchall()
+        evicted = []
+        for url, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((url,))
+            self._total_bytes -= size
+        self._connection.executemany("DELETE FROM listings WHERE url = ?", evicted)
+    
+    def clear(self):
+        """Remove every cached listing"""
+        with self._lock:
+            self._connection.execute("DELETE FROM listings")
+            self._connection.commit()
+            self._total_bytes = 0
+    
+    def close(self):
+        """Close the cache database"""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,259 @@
+"""
+Saved scan results: reload a previous scan at startup and list what changed since
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import threading
+from array import array
+from config.settings import SCAN_SNAPSHOT_PATH, SCAN_SNAPSHOTS_KEEP
+from src.core.file_index import FileIndex
+from src.core.sync import sync_key
+from src.utils.url_utils import canonical_url
+from src.utils.lazy_import import lazy_import
+
+sqlite3 = lazy_import("sqlite3")  # loaded when the store is opened
+
+COMPRESSION_LEVEL = 1  # names compress well even at the fastest level
+ARRAY_COLUMNS = {"folders": "I", "sizes": "q", "modified": "d"}  # FileIndex arrays and their typecodes
+
+
+class ScanSnapshotStore:
+    """SQLite store of completed scans, each kept as a few compressed columns of its file index"""
+    
+    def __init__(self, path=SCAN_SNAPSHOT_PATH, keep=SCAN_SNAPSHOTS_KEEP):
+        self.path = path
+        self.keep = keep
+        self._lock = threading.Lock()
+        
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, root_url TEXT, created_at REAL, "
+            "total_files INTEGER, total_folders INTEGER, total_bytes INTEGER, "
+            "failed_folders TEXT, scan_stats TEXT)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS snapshots_root ON snapshots (root_url, id)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS snapshot_data ("
+            "snapshot_id INTEGER PRIMARY KEY, strings BLOB, folders BLOB, sizes BLOB, "
+            "modified BLOB, size_exact BLOB)"
+        )
+        self._connection.commit()
+    
+    def save(self, root_url, results):
+        """Store scan results and drop the oldest snapshots of root_url beyond the limit; returns the new id"""
+        columns = results["file_links"].to_columns()
+        strings = {
+            "byteorder": sys.byteorder,
+            "folder_paths": columns["folder_paths"],
+            "folder_bases": columns["folder_bases"],
+            "names": columns["names"],
+            "extras": columns["extras"],
+            "tree": [
+                [relative_path, entry["folders"], entry["files"].start, entry["files"].stop]
+                for relative_path, entry in results["folder_structure"].items()
+            ]
+        }
+        strings_blob = zlib.compress(json.dumps(strings, separators=(",", ":")).encode("utf-8"), COMPRESSION_LEVEL)
+        root_url = canonical_url(root_url)
+        
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO snapshots (root_url, created_at, total_files, total_folders, total_bytes, "
+                "failed_folders, scan_stats) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (root_url, time.time(), results["total_files"], results["total_folders"], results["total_bytes"],
+                 json.dumps(results.get("failed_folders", [])), json.dumps(results["scan_stats"]))
+            )
+            snapshot_id = cursor.lastrowid
+            self._connection.execute(
+                "INSERT INTO snapshot_data VALUES (?, ?, ?, ?, ?, ?)",
+                (snapshot_id, strings_blob, columns["folders"], columns["sizes"], columns["modified"],
+                 columns["size_exact"])
+            )
+            
+            expired = self._connection.execute(
+                "SELECT id FROM snapshots WHERE root_url = ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+                (root_url, max(1, self.keep))
+            ).fetchall()
+            self._connection.executemany("DELETE FROM snapshots WHERE id = ?", expired)
+            self._connection.executemany("DELETE FROM snapshot_data WHERE snapshot_id = ?", expired)
+            self._connection.commit()
+        return snapshot_id
+    
+    def snapshots(self, root_url):
+        """Saved snapshots of root_url, newest first, without their files"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, created_at, total_files, total_folders, total_bytes FROM snapshots "
+                "WHERE root_url = ? ORDER BY id DESC",
+                (canonical_url(root_url),)
+            ).fetchall()
+        return [
+            {'id': row[0], 'created_at': row[1], 'total_files': row[2], 'total_folders': row[3], 'total_bytes': row[4]}
+            for row in rows
+        ]
+    
+    def latest(self, root_url):
+        """Id of the newest snapshot of root_url, or None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT MAX(id) FROM snapshots WHERE root_url = ?", (canonical_url(root_url),)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def load(self, snapshot_id):
+        """Scan results of a snapshot, shaped like DirectoryScanner.get_scan_results(); None if it is gone"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT s.root_url, s.created_at, s.total_folders, s.failed_folders, s.scan_stats, "
+                "d.strings, d.folders, d.sizes, d.modified, d.size_exact "
+                "FROM snapshots s JOIN snapshot_data d ON d.snapshot_id = s.id WHERE s.id = ?",
+                (snapshot_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        
+        root_url, created_at, total_folders, failed_folders, scan_stats, strings_blob = row[:6]
+        strings = json.loads(zlib.decompress(strings_blob))
+        columns = dict(strings, size_exact=row[9])
+        for (name, typecode), data in zip(ARRAY_COLUMNS.items(), row[6:9]):
+            if strings["byteorder"] != sys.byteorder:
+                # Written on a machine of the other endianness
+                values = array(typecode, data)
+                values.byteswap()
+                data = values.tobytes()
+            columns[name] = data
+        file_links = FileIndex.from_columns(columns)
+        
+        scan_stats = json.loads(scan_stats)
+        return {
+            "file_links": file_links,
+            "folder_structure": {
+                relative_path: {"folders": folders, "files": range(start, stop)}
+                for relative_path, folders, start, stop in strings["tree"]
+            },
+            "total_files": len(file_links),
+            "total_folders": total_folders,
+            "total_bytes": scan_stats.get('total_bytes', 0),
+            "folders_per_second": scan_stats.get('folders_per_second', 0),
+            "failed_folders": json.loads(failed_folders),
+            "scan_stats": scan_stats,
+            "snapshot_id": snapshot_id,
+            "root_url": root_url,
+            "created_at": created_at
+        }
+    
+    def close(self):
+        """Close the snapshot database"""
+        with self._lock:
+            self._connection.close()
+
+
+def _keyed_positions(index):
+    """Map the sync key of every indexed file to its position, straight from the columns"""
+    prefixes = [f"{path}/".replace(os.sep, "/") if path else "" for path in index.folder_paths]
+    return {prefixes[folder_id] + name: position for position, (folder_id, name) in enumerate(zip(index.folders, index.names))}
+
+
+def _index_state(index, position):
+    """(size, size_exact, modified, etag) of an indexed file, None where unknown"""
+    size = index.sizes[position]
+    modified = index.modified[position]
+    extra = index.extras.get(position)
+    return (
+        size if size >= 0 else None,
+        bool(index.size_exact[position]) if size >= 0 else None,
+        None if modified != modified else modified,  # NaN when unknown
+        extra.get("etag") if extra else None
+    )
+
+
+def _entry_state(file_info):
+    """(size, size_exact, modified, etag) of a scanned file"""
+    size = file_info.get("size")
+    return size, file_info.get("size_exact") if size is not None else None, file_info.get("modified"), file_info.get("etag")
+
+
+def _changed(old_state, new_state):
+    """Whether two file states describe different contents; unknown values never count as a change"""
+    old_size, old_exact, old_modified, old_etag = old_state
+    new_size, new_exact, new_modified, new_etag = new_state
+    if old_etag and new_etag:
+        return old_etag != new_etag
+    # Rounded listing sizes ("1.2M") only compare with sizes rounded the same way
+    if old_size is not None and new_size is not None and old_exact == new_exact and old_size != new_size:
+        return True
+    return old_modified is not None and new_modified is not None and old_modified != new_modified
+
+
+def diff_indexes(old, new, unlisted=()):
+    """Files added, removed and changed from an older scan to a newer one, with their byte totals
+    
+    Files of folders in unlisted (relative paths the newer scan failed to
+    list) are not reported as removed.
+    """
+    old_keys = _keyed_positions(old)
+    new_keys = _keyed_positions(new)
+    
+    added, changed = [], []
+    for key, position in new_keys.items():
+        old_position = old_keys.get(key)
+        if old_position is None:
+            added.append(position)
+        elif _changed(_index_state(old, old_position), _index_state(new, position)):
+            changed.append(position)
+    
+    unlisted = set(unlisted)
+    unlisted_prefixes = tuple(path + os.sep for path in unlisted if path)
+    
+    def still_listed(position):
+        relative_path = old.relative_path(position)
+        return relative_path not in unlisted and not relative_path.startswith(unlisted_prefixes)
+    
+    if "" in unlisted:
+        removed = []  # the root was not listed, so nothing is known to be gone
+    else:
+        removed = [position for key, position in old_keys.items() if key not in new_keys and still_listed(position)]
+    
+    def total_bytes(index, positions):
+        return sum(index.sizes[position] for position in positions if index.sizes[position] > 0)
+    
+    return {
+        "added": [new[position] for position in added],
+        "removed": [old[position] for position in removed],
+        "changed": [new[position] for position in changed],
+        "added_bytes": total_bytes(new, added),
+        "removed_bytes": total_bytes(old, removed),
+        "changed_bytes": total_bytes(new, changed)
+    }
+
+
+def diff_summary(diff):
+    """Counts and byte totals of a diff, without the file lists"""
+    summary = {key: value for key, value in diff.items() if key.endswith("_bytes")}
+    for key in ("added", "removed", "changed"):
+        summary[key] = len(diff[key])
+    return summary
+
+
+def changed_since(old_index):
+    """File filter keeping files that are new or changed compared with an older scan"""
+    old_keys = _keyed_positions(old_index)
+    
+    def keep(file_info):
+        position = old_keys.get(sync_key(file_info))
+        return position is None or _changed(_index_state(old_index, position), _entry_state(file_info))
+    
+    return keep
@@ -4,23 +4,61 @@ Core scanning functionality for directory traversal
 
 import os
 import time
+import queue
+import heapq
+import logging
 import threading
-from config.settings import SUPPORTED_FILE_TYPES, MAX_SCAN_DEPTH, SCAN_SLEEP_TIME
-from src.utils.network_utils import NetworkManager
+from itertools import count
+from config.settings import (
+    SUPPORTED_FILE_TYPES, MAX_SCAN_DEPTH, SCAN_SLEEP_TIME, SCAN_WORKERS,
+    SCAN_CACHE_ENABLED, SCAN_SNAPSHOTS_ENABLED, SIZE_HEAD_FALLBACK, HEAD_BATCH_SIZE
+)
+from src.utils.network_utils import create_network_manager
 from src.utils.file_utils import is_supported_file
+from src.utils.url_utils import VisitedSet, canonical_url
+from src.core.scan_cache import ScanCache
+from src.core.scan_snapshots import ScanSnapshotStore, diff_indexes, diff_summary
+from src.core.file_index import FileIndex
+from src.utils.lazy_import import lazy_import
+
+asyncio = lazy_import("asyncio")  # only needed by the asyncio backend
+
+logger = logging.getLogger(__name__)
 
 
 class DirectoryScanner:
-    """Handle recursive directory scanning"""
+    """Handle breadth-first directory scanning with a pool of listing fetchers"""
     
-    def __init__(self):
-        self.network_manager = NetworkManager()
+    def __init__(self, network_manager=None, scan_cache=None, snapshot_store=None):
+        self.network_manager = network_manager or create_network_manager()
+        if scan_cache is None and SCAN_CACHE_ENABLED:
+            scan_cache = ScanCache()
+        self.scan_cache = scan_cache
+        if snapshot_store is None and SCAN_SNAPSHOTS_ENABLED:
+            snapshot_store = ScanSnapshotStore()
+        self.snapshot_store = snapshot_store
+        self.snapshot_id = None
+        self.changes = None  # diff against the previous snapshot of the same URL
         self.is_scanning = False
         self.scan_paused = False
-        self.file_links = []
+        self.file_links = FileIndex()
         self.folder_structure = {}
         self.progress_callback = None
         self.update_callback = None
+        self.scan_workers = SCAN_WORKERS
+        self.scan_stats = self._new_scan_stats()
+        self.pipeline = None
+        self.failed_folders = []
+        self._visited = VisitedSet()  # every folder URL queued in this scan
+        self._signatures = {}  # relative path -> signature of a listing with subfolders
+        self._work_queue = None
+        self._delayed = []  # heap of (due time, sequence, work item) waiting to be retried
+        self._sequence = count()
+        self._generation = 0  # bumped by every new scan; workers of older scans publish nothing
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._results_lock = threading.Lock()
+        self._done_event = threading.Event()
     
     def set_progress_callback(self, callback):
         """Set callback for progress updates"""
@@ -30,21 +68,89 @@ class DirectoryScanner:
         """Set callback for real-time updates"""
         self.update_callback = callback
     
-    def start_scan(self, url):
-        """Start scanning process"""
+    def start_scan(self, url, pipeline=None):
+        """Start scanning process; files found are also fed to pipeline, if given"""
+        generation = self._reset_scan(pipeline)
+        threading.Thread(target=self._run_scan, args=(url, generation), daemon=True).start()
+    
+    def scan(self, url, pipeline=None):
+        """Scan in the calling thread and return the results"""
+        generation = self._reset_scan(pipeline)
+        self._run_scan(url, generation)
+        return self.get_scan_results()
+    
+    def _reset_scan(self, pipeline=None):
+        """Clear results before a new scan; returns the scan's generation"""
+        with self._results_lock:
+            # Workers of a cancelled scan may still be fetching; they must not
+            # publish into the results below
+            self._generation += 1
+            generation = self._generation
+        self.pipeline = pipeline
         self.is_scanning = True
         self.scan_paused = False
-        self.file_links = []
+        self.file_links = FileIndex()
         self.folder_structure = {}
+        self.failed_folders = []
+        self.snapshot_id = None
+        self.changes = None
+        self._visited = VisitedSet()
+        self._signatures = {}
+        self.scan_stats = self._new_scan_stats()
+        self.network_manager.retry.reset()
+        return generation
+    
+    def _is_current(self, generation):
+        """Whether the scan of this generation is still running, neither cancelled nor replaced"""
+        return self.is_scanning and self._generation == generation
+    
+    def _run_scan(self, url, generation):
+        """Crawl from url, reporting unexpected failures as errors"""
+        pipeline = self.pipeline
+        try:
+            self._crawl(url, generation)
+        except Exception as e:
+            if self.progress_callback:
+                self.progress_callback("error", str(e))
+        finally:
+            if pipeline:
+                pipeline.close()
+    
+    def _save_snapshot(self, root_url):
+        """Store a completed scan and compare it with the previous one of the same URL"""
+        if self.snapshot_store is None:
+            return
         
-        def scan_thread():
-            try:
-                self._scan_recursive(url, "", 0)
-            except Exception as e:
-                if self.progress_callback:
-                    self.progress_callback("error", str(e))
+        try:
+            previous_id = self.snapshot_store.latest(root_url)
+            self.snapshot_id = self.snapshot_store.save(root_url, self.get_scan_results())
+            previous = self.snapshot_store.load(previous_id) if previous_id is not None else None
+        except Exception as e:
+            # The scan itself succeeded; only reloading and diffing are lost
+            logger.warning("Không lưu được kết quả quét: %s", e)
+            return
+        
+        if previous is not None:
+            unlisted = [folder["relative_path"] for folder in self.failed_folders]
+            self.changes = diff_indexes(previous["file_links"], self.file_links, unlisted)
+    
+    def load_snapshot(self, url):
+        """Use the newest saved scan of url instead of crawling; returns its results, or None if there is none"""
+        if self.snapshot_store is None:
+            return None
+        snapshot_id = self.snapshot_store.latest(url)
+        results = self.snapshot_store.load(snapshot_id) if snapshot_id is not None else None
+        if results is None:
+            return None
         
-        threading.Thread(target=scan_thread, daemon=True).start()
+        with self._results_lock:
+            self.file_links = results["file_links"]
+            self.folder_structure = results["folder_structure"]
+            self.failed_folders = results["failed_folders"]
+            self.scan_stats = results["scan_stats"]
+            self.snapshot_id = snapshot_id
+            self.changes = None
+        return dict(self.get_scan_results(), created_at=results["created_at"])
     
     def pause_scan(self):
         """Pause scanning"""
@@ -65,63 +171,433 @@ class DirectoryScanner:
         if self.progress_callback:
             self.progress_callback("cancelled", "Đã hủy quét")
     
-    def _scan_recursive(self, url, relative_path, depth):
-        """Recursive scanning implementation"""
-        if depth > MAX_SCAN_DEPTH or not self.is_scanning:
-            return
+    def _new_scan_stats(self):
+        """Create empty throughput statistics"""
+        return {
+            'start_time': time.time(),
+            'end_time': 0,
+            'folders_scanned': 0,
+            'folders_per_second': 0,
+            'cache_hits': 0,
+            'cache_revalidated': 0,
+            'cache_misses': 0,
+            'total_bytes': 0,
+            'files_without_size': 0,
+            'duplicate_folders': 0  # links and redirects to folders already listed, symlink loops
+        }
+    
+    def _crawl(self, root_url, generation):
+        """Breadth-first crawl on the configured network backend"""
+        self._visited.add(root_url)
+        if self.network_manager.is_async:
+            asyncio.run(self._crawl_async(root_url, generation))
+        else:
+            self._crawl_threaded(root_url, generation)
+        
+        if self._generation != generation:
+            return  # replaced by a newer scan, whose results these are not
+        
+        self.scan_stats['end_time'] = time.time()
+        self._update_throughput()
+        
+        if self.is_scanning and "" not in self.folder_structure:
+            # The root listing failed for good: nothing was scanned, and an
+            # empty snapshot must not become the baseline of the next diff
+            self.is_scanning = False
+            if self.progress_callback:
+                self.progress_callback("error", "Quét thất bại: không đọc được thư mục gốc")
+        elif self.is_scanning:
+            self._save_snapshot(root_url)
+            self.is_scanning = False
+            if self.progress_callback:
+                self.progress_callback(
+                    "completed",
+                    f"Hoàn tất quét {self.scan_stats['folders_scanned']} thư mục "
+                    f"({self.scan_stats['folders_per_second']:.1f} thư mục/giây)"
+                )
+    
+    def _crawl_threaded(self, root_url, generation):
+        """Crawl with a pool of worker threads sharing a work queue"""
+        work_queue = queue.Queue()
+        with self._pending_lock:
+            self._work_queue = work_queue
+            self._done_event.clear()
+            self._delayed = []
+            self._pending = 0
+        self._enqueue(generation, root_url, "", 0)
+        
+        workers = []
+        for _ in range(max(1, self.scan_workers)):
+            worker = threading.Thread(target=self._crawl_worker, args=(work_queue, generation), daemon=True)
+            worker.start()
+            workers.append(worker)
+        
+        # Wait for the queue to drain or for the scan to be cancelled,
+        # handing listings whose retry is due back to the workers
+        while not self._done_event.wait(SCAN_SLEEP_TIME):
+            if not self._is_current(generation):
+                break
+            self._release_due()
+        
+        for _ in workers:
+            work_queue.put(None)
+        
+        if SIZE_HEAD_FALLBACK:
+            for batch in self._files_missing_size():
+                if not self._is_current(generation):
+                    break
+                urls = [self.file_links.url(position) for position in batch]
+                self._apply_file_infos(generation, batch, self.network_manager.get_file_infos(urls))
+    
+    def _enqueue(self, generation, url, relative_path, depth):
+        """Queue a folder listing for scanning"""
+        with self._pending_lock:
+            if self._generation != generation:
+                return
+            self._pending += 1
+            self._work_queue.put((url, relative_path, depth))
+    
+    def _enqueue_later(self, generation, delay, item):
+        """Queue a listing to be retried after delay seconds"""
+        with self._pending_lock:
+            if self._generation != generation:
+                return
+            self._pending += 1
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._sequence), item))
+    
+    def _release_due(self):
+        """Move listings whose retry time has come to the work queue"""
+        now = time.monotonic()
+        with self._pending_lock:
+            while self._delayed and self._delayed[0][0] <= now:
+                self._work_queue.put(heapq.heappop(self._delayed)[2])
+    
+    def _crawl_worker(self, work_queue, generation):
+        """Worker loop fetching listings until a sentinel arrives"""
+        while True:
+            item = work_queue.get()
+            if item is None:
+                break
+            
+            try:
+                if self._is_current(generation):
+                    subfolders, retry = self._scan_folder(generation, *item)
+                    for subfolder in subfolders:
+                        self._enqueue(generation, *subfolder)
+                    if retry:
+                        self._enqueue_later(generation, *retry)
+            finally:
+                with self._pending_lock:
+                    # A newer scan has reset the counter
+                    if self._generation == generation:
+                        self._pending -= 1
+                        if self._pending == 0:
+                            self._done_event.set()
+    
+    async def _crawl_async(self, root_url, generation):
+        """Crawl with many listing fetches in flight on one event loop"""
+        work_queue = asyncio.Queue()
+        work_queue.put_nowait((root_url, "", 0))
+        
+        async with self.network_manager:
+            workers = [
+                asyncio.create_task(self._crawl_worker_async(work_queue, generation))
+                for _ in range(max(1, self.network_manager.max_in_flight))
+            ]
+            
+            # Wait for the queue to drain or for the scan to be cancelled
+            drained = asyncio.create_task(work_queue.join())
+            while self._is_current(generation) and not drained.done():
+                await asyncio.wait({drained}, timeout=SCAN_SLEEP_TIME)
+            
+            for task in workers + [drained]:
+                task.cancel()
+            await asyncio.gather(*workers, drained, return_exceptions=True)
+            
+            if SIZE_HEAD_FALLBACK:
+                for batch in self._files_missing_size():
+                    if not self._is_current(generation):
+                        break
+                    urls = [self.file_links.url(position) for position in batch]
+                    infos = await self.network_manager.get_file_infos(urls)
+                    self._apply_file_infos(generation, batch, infos)
+    
+    async def _crawl_worker_async(self, work_queue, generation):
+        """Coroutine fetching listings from the shared queue"""
+        while True:
+            item = await work_queue.get()
+            try:
+                # A listing to retry keeps its worker, which costs nothing while it sleeps
+                while item and self._is_current(generation):
+                    subfolders, retry = await self._scan_folder_async(generation, *item)
+                    for subfolder in subfolders:
+                        work_queue.put_nowait(subfolder)
+                    item = None
+                    if retry:
+                        delay, item = retry
+                        await asyncio.sleep(delay)
+            finally:
+                work_queue.task_done()
+    
+    def _files_missing_size(self):
+        """Yield batches of positions of scanned files whose listing showed no size"""
+        with self._results_lock:
+            missing = self.file_links.positions_missing_size()
+        
+        for start in range(0, len(missing), HEAD_BATCH_SIZE):
+            if self.progress_callback:
+                self.progress_callback(
+                    "scanning",
+                    f"Đang lấy kích thước tệp: {start}/{len(missing)}"
+                )
+            yield missing[start:start + HEAD_BATCH_SIZE]
+    
+    def _apply_file_infos(self, generation, positions, infos):
+        """Store sizes and validators from HEAD responses in the file index"""
+        with self._results_lock:
+            if self._generation != generation:
+                return
+            for position, info in zip(positions, infos):
+                if info is None:
+                    continue
+                self.file_links.set_info(
+                    position,
+                    size=info['size'],
+                    size_exact=True,
+                    etag=info['etag'],
+                    last_modified=info['last_modified']
+                )
+                self.scan_stats['total_bytes'] += info['size']
+                self.scan_stats['files_without_size'] -= 1
+    
+    def _update_throughput(self):
+        """Recompute folders-per-second throughput"""
+        end_time = self.scan_stats['end_time'] or time.time()
+        elapsed_time = end_time - self.scan_stats['start_time']
+        if elapsed_time > 0:
+            self.scan_stats['folders_per_second'] = self.scan_stats['folders_scanned'] / elapsed_time
+    
+    def _scan_folder(self, generation, url, relative_path, depth, attempt=0):
+        """Scan a single folder listing; returns its subfolders and (delay, work item) if it must be retried"""
+        if depth > MAX_SCAN_DEPTH or not self._is_current(generation):
+            return [], None
         
         # Wait if paused
-        while self.scan_paused and self.is_scanning:
+        while self.scan_paused and self._is_current(generation):
             time.sleep(SCAN_SLEEP_TIME)
         
-        if not self.is_scanning:
-            return
+        if not self._is_current(generation):
+            return [], None
         
+        pipeline = self.pipeline
         try:
-            # Update progress
-            display_path = relative_path if relative_path else "thư mục gốc"
-            if self.progress_callback:
-                self.progress_callback("scanning", f"Đang quét: {display_path} (Độ sâu: {depth})")
+            wait = self.network_manager.retry.host_wait(url)
+            if wait:
+                return [], (wait, (url, relative_path, depth, attempt))
             
-            # Get page content
-            html_content = self.network_manager.get_page_content(url)
-            folders, all_files = self.network_manager.parse_directory_links(html_content, url)
+            self._report_scanning(relative_path, depth)
+            listing = self._fetch_listing(url)
+            if listing is None:
+                return [], None
+            folders, all_files = listing
+            subfolders, new_files = self._publish_listing(generation, url, relative_path, depth, folders, all_files)
+            if pipeline and new_files:
+                # Blocks while the download queue is full, slowing this worker down
+                pipeline.put(new_files)
+            return subfolders, None
+        except Exception as e:
+            if not self._is_current(generation):
+                return [], None
+            return [], self._listing_failed(url, relative_path, depth, attempt, e)
+    
+    async def _scan_folder_async(self, generation, url, relative_path, depth, attempt=0):
+        """Scan a single folder listing on the event loop"""
+        if depth > MAX_SCAN_DEPTH or not self._is_current(generation):
+            return [], None
+        
+        # Wait if paused
+        while self.scan_paused and self._is_current(generation):
+            await asyncio.sleep(SCAN_SLEEP_TIME)
+        
+        if not self._is_current(generation):
+            return [], None
+        
+        pipeline = self.pipeline
+        try:
+            wait = self.network_manager.retry.host_wait(url)
+            if wait:
+                return [], (wait, (url, relative_path, depth, attempt))
             
-            # Filter supported files
-            files = []
-            for file_info in all_files:
-                if is_supported_file(file_info["href"], SUPPORTED_FILE_TYPES):
-                    file_info.update({
-                        "relative_path": relative_path,
-                        "full_path": os.path.join(relative_path, file_info["name"]) if relative_path else file_info["name"]
-                    })
-                    files.append(file_info)
-                    self.file_links.append(file_info)
+            self._report_scanning(relative_path, depth)
+            listing = await self._fetch_listing_async(url)
+            if listing is None:
+                return [], None
+            folders, all_files = listing
+            subfolders, new_files = self._publish_listing(generation, url, relative_path, depth, folders, all_files)
+            if pipeline and new_files:
+                # Wait for queue space off the event loop
+                await asyncio.get_running_loop().run_in_executor(None, pipeline.put, new_files)
+            return subfolders, None
+        except Exception as e:
+            if not self._is_current(generation):
+                return [], None
+            return [], self._listing_failed(url, relative_path, depth, attempt, e)
+    
+    def _report_scanning(self, relative_path, depth):
+        """Report the folder currently being scanned"""
+        display_path = relative_path if relative_path else "thư mục gốc"
+        if self.progress_callback:
+            self.progress_callback(
+                "scanning",
+                f"Đang quét: {display_path} (Độ sâu: {depth}) - "
+                f"{self.scan_stats['folders_per_second']:.1f} thư mục/giây"
+            )
+    
+    def _listing_failed(self, url, relative_path, depth, attempt, error):
+        """Schedule a failed listing for another try; returns (delay, work item), or None once it is given up"""
+        delay = self.network_manager.retry.record_failure(url, error, attempt)
+        if delay is None:
+            self._report_error(url, relative_path, error, attempt + 1)
+            return None
+        
+        if self.progress_callback:
+            display_path = relative_path if relative_path else "thư mục gốc"
+            self.progress_callback("retrying", f"Thử lại {display_path} sau {delay:.0f} giây: {str(error)}")
+        return delay, (url, relative_path, depth, attempt + 1)
+    
+    def _report_error(self, url, relative_path, error, attempts=1):
+        """Report a folder listing that failed for good"""
+        with self._results_lock:
+            self.failed_folders.append({
+                "url": url,
+                "relative_path": relative_path,
+                "error": str(error),
+                "attempts": attempts
+            })
+        if self.progress_callback:
+            self.progress_callback("error", f"Lỗi quét {relative_path} ({attempts} lần thử): {str(error)}")
+    
+    def _fetch_listing(self, url):
+        """Get the parsed folders and files of a listing, using the scan cache"""
+        cached = self._cached_listing(url)
+        if cached and self.scan_cache.is_fresh(cached):
+            self._count_stat('cache_hits')
+            return cached['folders'], cached['files']
+        
+        validators = (cached['etag'], cached['last_modified']) if cached else (None, None)
+        page = self.network_manager.fetch_directory_listing(url, *validators)
+        self.network_manager.retry.record_success(url)
+        return self._resolve_listing(url, cached, page)
+    
+    async def _fetch_listing_async(self, url):
+        """Get the parsed folders and files of a listing on the event loop"""
+        cached = self._cached_listing(url)
+        if cached and self.scan_cache.is_fresh(cached):
+            self._count_stat('cache_hits')
+            return cached['folders'], cached['files']
+        
+        validators = (cached['etag'], cached['last_modified']) if cached else (None, None)
+        page = await self.network_manager.fetch_directory_listing(url, *validators)
+        self.network_manager.retry.record_success(url)
+        return self._resolve_listing(url, cached, page)
+    
+    def _cached_listing(self, url):
+        """Look up a listing in the scan cache"""
+        if self.scan_cache is None:
+            return None
+        return self.scan_cache.get(url)
+    
+    def _resolve_listing(self, url, cached, page):
+        """Use the cached listing when unchanged, otherwise cache the new one; None if it was listed already"""
+        if page['not_modified'] and cached:
+            self.scan_cache.touch(url)
+            self._count_stat('cache_revalidated')
+            return cached['folders'], cached['files']
+        
+        final_url = page.get('url')
+        if final_url and canonical_url(final_url) != canonical_url(url) and not self._visited.add(final_url):
+            # Redirected to a folder this scan has already listed
+            self._count_stat('duplicate_folders')
+            return None
+        
+        folders, all_files = page['folders'], page['files']
+        if self.scan_cache is not None:
+            self.scan_cache.put(url, folders, all_files, page['etag'], page['last_modified'])
+        self._count_stat('cache_misses')
+        return folders, all_files
+    
+    def _count_stat(self, key):
+        """Count a cache or duplicate outcome for the scan statistics"""
+        with self._results_lock:
+            self.scan_stats[key] += 1
+    
+    def _publish_listing(self, generation, url, relative_path, depth, folders, all_files):
+        """Publish a listing's files; returns subfolders to scan and the new file entries"""
+        # Filter supported files
+        files = [
+            file_info for file_info in all_files
+            if is_supported_file(file_info["href"], SUPPORTED_FILE_TYPES)
+        ]
+        
+        # A listing identical to a parent's is a symlink back up the tree
+        signature = None
+        if folders:
+            signature = hash((
+                tuple(folder["name"] for folder in folders),
+                tuple((file_info["name"], file_info.get("size"), file_info.get("modified")) for file_info in all_files)
+            ))
+        
+        # Publish results; the lock keeps file_links and the update
+        # callback consistent for listeners that index into file_links
+        with self._results_lock:
+            if not self._is_current(generation):
+                return [], []
+            if signature is not None:
+                if self._repeats_ancestor(relative_path, signature):
+                    self.scan_stats['duplicate_folders'] += 1
+                    return [], []
+                self._signatures[relative_path] = signature
             
-            # Store structure
+            start = self.file_links.add_files(relative_path, url, files)
+            new_files = self.file_links[start:start + len(files)]
+            for file_info in files:
+                if "size" in file_info:
+                    self.scan_stats['total_bytes'] += file_info["size"]
+                else:
+                    self.scan_stats['files_without_size'] += 1
             self.folder_structure[relative_path] = {
                 "folders": folders,
-                "files": files
+                "files": range(start, start + len(files))  # positions in file_links
             }
+            self.scan_stats['folders_scanned'] += 1
+            self._update_throughput()
             
             # Update UI in real-time
             if self.update_callback and (files or folders):
                 self.update_callback(relative_path, folders, files)
-            
-            # Continue scanning subfolders
-            for folder in folders:
-                if self.is_scanning:
-                    new_relative_path = os.path.join(relative_path, folder["name"]) if relative_path else folder["name"]
-                    self._scan_recursive(
-                        folder["url"],
-                        new_relative_path,
-                        depth + 1
-                    )
         
-        except Exception as e:
-            print(f"Lỗi khi quét {url}: {str(e)}")
-            if self.progress_callback:
-                self.progress_callback("error", f"Lỗi quét {relative_path}: {str(e)}")
+        # Subfolders for the next level
+        if depth + 1 > MAX_SCAN_DEPTH:
+            return [], new_files
+        
+        subfolders = []
+        for folder in folders:
+            # Each folder is listed once per scan however many links lead to it
+            if not self._visited.add(folder["url"]):
+                self._count_stat('duplicate_folders')
+                continue
+            new_relative_path = os.path.join(relative_path, folder["name"]) if relative_path else folder["name"]
+            subfolders.append((folder["url"], new_relative_path, depth + 1))
+        return subfolders, new_files
+    
+    def _repeats_ancestor(self, relative_path, signature):
+        """Whether a parent folder had a listing with the same signature"""
+        parent = relative_path
+        while parent:
+            parent = os.path.dirname(parent)
+            if self._signatures.get(parent) == signature:
+                return True
+        return False
     
     def get_scan_results(self):
         """Get current scan results"""
@@ -129,5 +605,11 @@ class DirectoryScanner:
             "file_links": self.file_links,
             "folder_structure": self.folder_structure,
             "total_files": len(self.file_links),
-            "total_folders": len(self.folder_structure)
+            "total_folders": len(self.folder_structure),
+            "total_bytes": self.scan_stats['total_bytes'],
+            "folders_per_second": self.scan_stats['folders_per_second'],
+            "failed_folders": list(self.failed_folders),
+            "snapshot_id": self.snapshot_id,
+            "changes": diff_summary(self.changes) if self.changes else None,
+            "scan_stats": dict(self.scan_stats)
         }
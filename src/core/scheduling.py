@@ -0,0 +1,66 @@
+"""
+Download ordering policies based on file sizes from listings or HEAD
+"""
+
+
+def _known_and_unknown(files):
+    """Split files into those with a known size and the rest, keeping scan order"""
+    known = [file_info for file_info in files if file_info.get("size") is not None]
+    unknown = [file_info for file_info in files if file_info.get("size") is None]
+    return known, unknown
+
+
+def scan_order(files):
+    """Download in the order the scan found the files"""
+    return list(files)
+
+
+def smallest_first(files):
+    """Shortest job first: many files finish early for fast visible progress"""
+    known, unknown = _known_and_unknown(files)
+    return sorted(known, key=lambda file_info: file_info["size"]) + unknown
+
+
+def largest_first(files):
+    """Longest job first: big transfers start early for the shortest total time"""
+    known, unknown = _known_and_unknown(files)
+    return sorted(known, key=lambda file_info: file_info["size"], reverse=True) + unknown
+
+
+def interleaved(files):
+    """Largest files in descending order, each followed by a run of the smallest ones
+    
+    Big transfers keep streaming while small files fill the remaining slots,
+    and both groups run out at about the same time.
+    """
+    ordered = smallest_first(files)
+    known_count = sum(1 for file_info in ordered if file_info.get("size") is not None)
+    small, unknown = ordered[:known_count // 2 + known_count % 2], ordered[known_count:]
+    large = ordered[len(small):known_count][::-1]
+    if not large:
+        return small + unknown
+    
+    run_length = max(1, len(small) // len(large))
+    result = []
+    small_index = 0
+    for large_file in large:
+        result.append(large_file)
+        result.extend(small[small_index:small_index + run_length])
+        small_index += run_length
+    result.extend(small[small_index:])
+    return result + unknown
+
+
+SCHEDULING_POLICIES = {
+    "scan": scan_order,
+    "smallest_first": smallest_first,
+    "largest_first": largest_first,
+    "interleaved": interleaved,
+}
+
+
+def schedule_files(files, policy):
+    """Order files with a named policy"""
+    if policy not in SCHEDULING_POLICIES:
+        raise ValueError(f"Unknown scheduling policy: {policy}")
+    return SCHEDULING_POLICIES[policy](files)
@@ -0,0 +1,71 @@
+"""
+Low-overhead transfer statistics and progress throttling
+"""
+
+import time
+import threading
+from collections import deque
+from config.settings import PROGRESS_UPDATE_HZ, SPEED_WINDOW
+
+
+class TransferStats:
+    """Byte counters owned by each worker thread, merged on demand"""
+    
+    def __init__(self, window=SPEED_WINDOW):
+        self.window = window
+        self._counters = {}  # thread ident -> [bytes]; each list has a single writer
+        self._register_lock = threading.Lock()
+        self._samples = deque()
+        self._sample_lock = threading.Lock()
+    
+    def add(self, byte_count):
+        """Count transferred bytes for the calling thread without locking"""
+        counter = self._counters.get(threading.get_ident())
+        if counter is None:
+            counter = self._register()
+        counter[0] += byte_count
+    
+    def _register(self):
+        """Create the counter of the calling thread"""
+        with self._register_lock:
+            return self._counters.setdefault(threading.get_ident(), [0])
+    
+    def total(self):
+        """Merge all worker counters into a single byte total"""
+        return sum(counter[0] for counter in list(self._counters.values()))
+    
+    def sample(self):
+        """Record the current total and return (total, sliding-window speed)"""
+        now = time.monotonic()
+        total = self.total()
+        
+        with self._sample_lock:
+            self._samples.append((now, total))
+            while len(self._samples) > 2 and now - self._samples[1][0] >= self.window:
+                self._samples.popleft()
+            
+            oldest_time, oldest_total = self._samples[0]
+            elapsed_time = now - oldest_time
+            speed = (total - oldest_total) / elapsed_time if elapsed_time > 0 else 0
+        return total, speed
+
+
+class ProgressThrottle:
+    """Let at most `rate` events per second through"""
+    
+    def __init__(self, rate=PROGRESS_UPDATE_HZ):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._next_time = 0
+        self._lock = threading.Lock()
+    
+    def ready(self):
+        """Check whether an event may be emitted now"""
+        now = time.monotonic()
+        if now < self._next_time:
+            return False
+        
+        with self._lock:
+            if now < self._next_time:
+                return False
+            self._next_time = now + self.interval
+            return True
@@ -0,0 +1,108 @@
+"""
+Incremental sync support: decide which files are already up to date
+"""
+
+import os
+import json
+import threading
+from config.settings import SYNC_MANIFEST_NAME
+from src.utils.file_utils import parse_http_date
+
+
+class SyncManifest:
+    """Record of remote validators for files already in the download folder"""
+    
+    def __init__(self, download_folder):
+        self.path = os.path.join(download_folder, SYNC_MANIFEST_NAME)
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _load(self):
+        """Load manifest entries from disk"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file).get('files', {})
+        except (OSError, ValueError):
+            self.entries = {}
+    
+    def save(self):
+        """Write manifest entries to disk atomically"""
+        with self._lock:
+            data = {'files': dict(self.entries)}
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+        os.replace(temp_path, self.path)
+    
+    def get(self, key):
+        """Get the entry recorded for a relative file path"""
+        with self._lock:
+            return self.entries.get(key)
+    
+    def update(self, key, remote):
+        """Record the remote size and validators of a synced file"""
+        with self._lock:
+            entry = dict(self.entries.get(key) or {})
+            if entry.get('size') != remote.get('size', 0):
+                entry = {}
+            entry['size'] = remote.get('size', 0)
+            for field in ('etag', 'last_modified', 'modified'):
+                if remote.get(field) is not None:
+                    entry[field] = remote[field]
+            if 'hashes' in remote:
+                # Digests verified while downloading; replaced on every download
+                entry.pop('hashes', None)
+                if remote['hashes']:
+                    entry['hashes'] = dict(remote['hashes'])
+            self.entries[key] = entry
+    
+    def is_up_to_date(self, key, local_path, remote):
+        """Compare a local file against the remote size and validators"""
+        try:
+            local_stat = os.stat(local_path)
+        except OSError:
+            return False
+        
+        remote_size = remote.get('size', 0)
+        if remote_size and local_stat.st_size != remote_size:
+            return False
+        
+        entry = self.get(key)
+        if entry is not None:
+            if entry.get('size') != local_stat.st_size:
+                return False
+            checksum = remote.get('checksum')
+            if checksum and checksum[0] in entry.get('hashes', {}):
+                return entry['hashes'][checksum[0]] == checksum[1]
+            if remote.get('etag') and entry.get('etag'):
+                return remote['etag'] == entry['etag']
+            if remote.get('last_modified') and entry.get('last_modified'):
+                return remote['last_modified'] == entry['last_modified']
+            if remote.get('modified') is not None and entry.get('modified') is not None:
+                return remote['modified'] == entry['modified']
+        
+        # No usable manifest entry: trust size plus modification time
+        remote_mtime = parse_http_date(remote.get('last_modified')) or remote.get('modified')
+        if remote_mtime is None:
+            return entry is not None and bool(remote_size)
+        return local_stat.st_mtime >= remote_mtime
+
+
+def listing_file_info(file_info):
+    """Remote size and validators already known from the scan, if exact"""
+    if not file_info.get("size_exact"):
+        return None
+    return {
+        'size': file_info["size"],
+        'etag': file_info.get("etag"),
+        'last_modified': file_info.get("last_modified"),
+        'modified': file_info.get("modified")
+    }
+
+
+def sync_key(file_info):
+    """Manifest key for a scanned file"""
+    relative_path = file_info.get("relative_path", "")
+    key = f"{relative_path}/{file_info['name']}" if relative_path else file_info["name"]
+    return key.replace(os.sep, "/")
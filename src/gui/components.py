@@ -3,96 +3,306 @@ Custom GUI components for the file downloader
 """
 
 import tkinter as tk
+from array import array
+from bisect import bisect_right
+from itertools import compress
 import customtkinter as ctk
-from config.settings import COLORS, FONTS, SCROLL_COLORS
+from config.settings import COLORS, FONTS, SCROLL_COLORS, FILE_LIST_ROW_HEIGHT
 from src.utils.file_utils import truncate_filename
 
 
-class ScrollableFileList(ctk.CTkScrollableFrame):
-    """Custom scrollable frame for file list"""
+class FolderSection:
+    """One folder of the file tree with the indices of its files"""
     
-    def __init__(self, parent, **kwargs):
-        super().__init__(
-            parent,
-            scrollbar_button_color=SCROLL_COLORS['button'],
-            scrollbar_button_hover_color=SCROLL_COLORS['button_hover'],
-            **kwargs
-        )
-        self.grid_columnconfigure(0, weight=1)
-        self.selected_files = {}
-        self.tree_widgets = {}
+    __slots__ = ("path", "file_count", "folder_count", "files", "collapsed")
     
-    def clear_list(self):
-        """Clear all widgets from the list"""
-        for widget in self.winfo_children():
-            widget.destroy()
-        self.selected_files = {}
-        self.tree_widgets = {}
+    def __init__(self, path, file_count=0, folder_count=0):
+        self.path = path
+        self.file_count = file_count
+        self.folder_count = folder_count
+        self.files = array("I")  # indices into the scan results
+        self.collapsed = False
     
-    def add_folder_header(self, folder_path, file_count, folder_count):
-        """Add folder header to the list"""
-        if folder_path and folder_path not in self.tree_widgets:
-            folder_frame = ctk.CTkFrame(self)
-            folder_frame.pack(fill="x", padx=5, pady=(5, 2), anchor="n")
-            
-            folder_label = ctk.CTkLabel(
-                folder_frame,
-                text=f"📁 {folder_path} ({file_count} tệp, {folder_count} thư mục con)",
-                font=ctk.CTkFont(size=FONTS['normal'][1], weight="bold"),
-                text_color=COLORS['primary']
-            )
-            folder_label.pack(side="left", padx=10, pady=5, anchor="w")
-            
-            self.tree_widgets[folder_path] = {
-                "frame": folder_frame,
-                "label": folder_label,
-                "files": []
-            }
-    
-    def add_file_item(self, file_info, file_index):
-        """Add file item to the list"""
-        folder_path = file_info.get("relative_path", "")
-        
-        # Create file frame
-        file_frame = ctk.CTkFrame(self)
-        file_frame.pack(fill="x", padx=15 if folder_path else 5, pady=1, anchor="n")
+    @property
+    def has_header(self):
+        return bool(self.path)
+    
+    def row_count(self):
+        """Number of rows this folder occupies in the list"""
+        return self.has_header + (0 if self.collapsed else len(self.files))
+
+
+class FileTreeModel:
+    """Compact backing model for the file list: folder sections and a selection bitset"""
+    
+    HEADER = -1  # position of a folder header row
+    
+    def __init__(self):
+        self.clear()
+    
+    def clear(self, names=()):
+        """Remove all folders and selection; names is the sequence file indices refer to"""
+        self.folders = []
+        self.folder_ids = {}
+        self.names = names
+        self.selected = bytearray()  # one byte per file index, 1 when selected
+        self.selected_count = 0
+        self._row_starts = [0]
+        self._dirty_from = 0  # first folder whose row start is stale
+    
+    @property
+    def file_count(self):
+        return len(self.selected)
+    
+    def folder_id(self, path, file_count=0, folder_count=0):
+        """Get the id of a folder section, creating it if needed"""
+        folder_id = self.folder_ids.get(path)
+        if folder_id is None:
+            folder_id = len(self.folders)
+            self.folder_ids[path] = folder_id
+            self.folders.append(FolderSection(path, file_count, folder_count))
+            self._invalidate(folder_id)
+        return folder_id
+    
+    def add_files(self, path, count, start_index):
+        """Append count files with consecutive indices from start_index to a folder"""
+        folder_id = self.folder_id(path)
+        end_index = start_index + count
+        if end_index > len(self.selected):
+            self.selected.extend(bytes(end_index - len(self.selected)))
         
-        # Create checkbox variable
-        var = tk.BooleanVar()
-        self.selected_files[file_index] = var
+        self.folders[folder_id].files.extend(range(start_index, end_index))
+        self._invalidate(folder_id)
+    
+    def _invalidate(self, folder_id):
+        """Mark row starts stale from a folder onwards"""
+        self._dirty_from = min(self._dirty_from, folder_id)
+    
+    def _row_starts_current(self):
+        """Cumulative first-row numbers of all folders, refreshed lazily"""
+        row_starts = self._row_starts
+        if self._dirty_from < len(self.folders) or len(row_starts) != len(self.folders) + 1:
+            del row_starts[self._dirty_from + 1:]
+            for folder in self.folders[self._dirty_from:]:
+                row_starts.append(row_starts[-1] + folder.row_count())
+            self._dirty_from = len(self.folders)
+        return row_starts
+    
+    def row_count(self):
+        """Total number of visible rows"""
+        return self._row_starts_current()[-1]
+    
+    def row_at(self, row):
+        """Map a row number to (folder_id, position); position is HEADER or an offset in the folder"""
+        row_starts = self._row_starts_current()
+        if row < 0 or row >= row_starts[-1]:
+            return None
         
-        # Truncate filename if too long
-        display_name = truncate_filename(file_info["name"], 60)
+        folder_id = bisect_right(row_starts, row) - 1
+        folder = self.folders[folder_id]
+        position = row - row_starts[folder_id] - folder.has_header
+        return folder_id, position
+    
+    def toggle_collapsed(self, folder_id):
+        """Collapse or expand a folder"""
+        folder = self.folders[folder_id]
+        folder.collapsed = not folder.collapsed
+        self._invalidate(folder_id)
+    
+    def set_selected(self, file_index, select):
+        """Select or deselect one file"""
+        select = 1 if select else 0
+        if self.selected[file_index] != select:
+            self.selected[file_index] = select
+            self.selected_count += 1 if select else -1
+    
+    def select_all(self, select=True):
+        """Select or deselect every file"""
+        self.selected = bytearray(b"\x01" if select else b"\x00") * len(self.selected)
+        self.selected_count = len(self.selected) if select else 0
+    
+    def select_folder(self, folder_id, select=True):
+        """Select or deselect every file of one folder"""
+        for file_index in self.folders[folder_id].files:
+            self.set_selected(file_index, select)
+    
+    def folder_selected(self, folder_id):
+        """Check whether every file of a folder is selected"""
+        files = self.folders[folder_id].files
+        return bool(files) and all(self.selected[file_index] for file_index in files)
+    
+    def selected_indices(self):
+        """Indices of all selected files in ascending order"""
+        return list(compress(range(len(self.selected)), self.selected))
+
+
+class ScrollableFileList(ctk.CTkFrame):
+    """Virtualized file tree that draws only the rows in view"""
+    
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.model = FileTreeModel()
+        self.row_height = FILE_LIST_ROW_HEIGHT
+        self.font = ctk.CTkFont(size=FONTS['small'][1])
+        self.header_font = ctk.CTkFont(size=FONTS['normal'][1], weight="bold")
+        self._redraw_pending = False
         
-        # Create checkbox
-        checkbox = ctk.CTkCheckBox(
-            file_frame,
-            text=f"  📄 {display_name}",
-            variable=var,
-            font=ctk.CTkFont(size=FONTS['small'][1])
+        self.canvas = tk.Canvas(self, highlightthickness=0, borderwidth=0)
+        self.scrollbar = ctk.CTkScrollbar(
+            self,
+            command=self._on_scrollbar,
+            button_color=SCROLL_COLORS['button'],
+            button_hover_color=SCROLL_COLORS['button_hover']
         )
-        checkbox.pack(side="left", padx=10, pady=3, anchor="w")
-        
-        # Update folder info if exists
-        if folder_path in self.tree_widgets:
-            self.tree_widgets[folder_path]["files"].append(file_info)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.pack(side="right", fill="y", padx=(0, 5), pady=5)
+        self.canvas.pack(side="left", fill="both", expand=True, padx=(5, 0), pady=5)
+        self._apply_colors()
         
-        return var
+        self.canvas.bind("<Configure>", lambda event: self._schedule_redraw())
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-4>", lambda event: self._scroll(-3))
+        self.canvas.bind("<Button-5>", lambda event: self._scroll(3))
+    
+    @property
+    def file_count(self):
+        return self.model.file_count
+    
+    @property
+    def selected_count(self):
+        return self.model.selected_count
+    
+    def _apply_colors(self):
+        """Match canvas colors to the current appearance mode"""
+        self.canvas.configure(bg=self._apply_appearance_mode(self.cget("fg_color")))
+        self.text_color = self._apply_appearance_mode(ctk.ThemeManager.theme["CTkLabel"]["text_color"])
+        self.folder_color = COLORS['primary']
+    
+    def _set_appearance_mode(self, mode_string):
+        super()._set_appearance_mode(mode_string)
+        self._apply_colors()
+        self._schedule_redraw()
+    
+    def clear_list(self, names=()):
+        """Clear all rows; names is the sequence of file names indices refer to"""
+        self.model.clear(names)
+        self.canvas.yview_moveto(0)
+        self._schedule_redraw()
+    
+    def add_folder_header(self, folder_path, file_count, folder_count):
+        """Add folder header to the list"""
+        if folder_path:
+            self.model.folder_id(folder_path, file_count, folder_count)
+            self._schedule_redraw()
+    
+    def add_file_items(self, folder_path, file_count, start_index):
+        """Add file_count files with consecutive indices from start_index"""
+        if file_count:
+            self.model.add_files(folder_path, file_count, start_index)
+            self._schedule_redraw()
     
     def update_folder_count(self, folder_path, file_count, folder_count):
         """Update folder file count"""
-        if folder_path in self.tree_widgets:
-            label = self.tree_widgets[folder_path]["label"]
-            label.configure(text=f"📁 {folder_path} ({file_count} tệp, {folder_count} thư mục con)")
+        folder_id = self.model.folder_ids.get(folder_path)
+        if folder_id is not None:
+            folder = self.model.folders[folder_id]
+            folder.file_count = file_count
+            folder.folder_count = folder_count
+            self._schedule_redraw()
     
     def select_all_files(self, select=True):
         """Select or deselect all files"""
-        for var in self.selected_files.values():
-            var.set(select)
+        self.model.select_all(select)
+        self._schedule_redraw()
+    
+    def select_files(self, indices, select=True):
+        """Select or deselect the files at the given indices"""
+        for file_index in indices:
+            self.model.set_selected(file_index, select)
+        self._schedule_redraw()
     
     def get_selected_indices(self):
         """Get indices of selected files"""
-        return [i for i, var in self.selected_files.items() if var.get()]
+        return self.model.selected_indices()
+    
+    # Rendering
+    def _schedule_redraw(self):
+        """Redraw once the current batch of changes is done"""
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._redraw)
+    
+    def _redraw(self):
+        """Draw the rows that intersect the viewport"""
+        self._redraw_pending = False
+        row_count = self.model.row_count()
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        self.canvas.configure(scrollregion=(0, 0, width, max(row_count * self.row_height, height)))
+        
+        top = self.canvas.canvasy(0)
+        first_row = max(0, int(top // self.row_height))
+        last_row = min(row_count, int((top + height) // self.row_height) + 1)
+        
+        self.canvas.delete("row")
+        for row in range(first_row, last_row):
+            self._draw_row(row, self.model.row_at(row))
+    
+    def _draw_row(self, row, location):
+        """Draw a folder header or file row"""
+        folder_id, position = location
+        folder = self.model.folders[folder_id]
+        y = row * self.row_height + self.row_height // 2
+        
+        if position == FileTreeModel.HEADER:
+            arrow = "▶" if folder.collapsed else "▼"
+            check = "☑" if self.model.folder_selected(folder_id) else "☐"
+            self.canvas.create_text(8, y, text=arrow, anchor="w", fill=self.folder_color, font=self.font, tags="row")
+            self.canvas.create_text(28, y, text=check, anchor="w", fill=self.text_color, font=self.header_font, tags="row")
+            self.canvas.create_text(
+                48, y, anchor="w", fill=self.folder_color, font=self.header_font, tags="row",
+                text=f"📁 {folder.path} ({folder.file_count} tệp, {folder.folder_count} thư mục con)"
+            )
+        else:
+            file_index = folder.files[position]
+            check = "☑" if self.model.selected[file_index] else "☐"
+            indent = 28 if folder.has_header else 8
+            self.canvas.create_text(
+                indent, y, anchor="w", fill=self.text_color, font=self.font, tags="row",
+                text=f"{check}  📄 {truncate_filename(self.model.names[file_index], 60)}"
+            )
+    
+    # Interaction
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self._schedule_redraw()
+    
+    def _scroll(self, units):
+        self.canvas.yview_scroll(units, "units")
+        self._schedule_redraw()
+    
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self._scroll(-delta)
+    
+    def _on_click(self, event):
+        """Toggle a file, or select/collapse a folder from its header"""
+        row = int(self.canvas.canvasy(event.y) // self.row_height)
+        location = self.model.row_at(row)
+        if location is None:
+            return
+        
+        folder_id, position = location
+        if position != FileTreeModel.HEADER:
+            file_index = self.model.folders[folder_id].files[position]
+            self.model.set_selected(file_index, not self.model.selected[file_index])
+        elif 24 <= event.x < 44:
+            self.model.select_folder(folder_id, not self.model.folder_selected(folder_id))
+        else:
+            self.model.toggle_collapsed(folder_id)
+        self._schedule_redraw()
 
 
 class ProgressDisplay(ctk.CTkFrame):
@@ -161,6 +371,7 @@ class StatusDisplay(ctk.CTkLabel):
             'ready': COLORS['text_gray'],
             'scanning': COLORS['primary'],
             'paused': COLORS['warning'],
+            'retrying': COLORS['warning'],
             'error': COLORS['danger'],
             'success': COLORS['success'],
             'cancelled': COLORS['text_gray']
@@ -0,0 +1,102 @@
+"""
+Marshal callbacks from worker threads onto the Tk main loop
+"""
+
+import time
+import queue
+import logging
+import threading
+from itertools import count
+from config.settings import UI_DRAIN_INTERVAL, UI_DRAIN_BUDGET
+
+logger = logging.getLogger(__name__)
+
+
+class UIEventBridge:
+    """Queue worker events and run them on the Tk thread in batches"""
+    
+    def __init__(self, root, interval=UI_DRAIN_INTERVAL, budget=UI_DRAIN_BUDGET):
+        self.root = root
+        self.interval = interval
+        self.budget = budget
+        self._sequence = count()  # orders events across both queues
+        self._events = queue.SimpleQueue()
+        self._held = None  # ordered event taken from the queue but not yet delivered
+        self._latest = {}  # key -> (sequence, handler, args); only the newest event per key is kept
+        self._latest_lock = threading.Lock()
+        self._running = False
+    
+    def start(self):
+        """Start draining events on the Tk loop"""
+        if not self._running:
+            self._running = True
+            self.root.after(self.interval, self._drain)
+    
+    def stop(self):
+        """Stop draining events"""
+        self._running = False
+    
+    def post(self, handler, *args):
+        """Queue an event that must be delivered in order"""
+        self._events.put((next(self._sequence), handler, args))
+    
+    def post_latest(self, key, handler, *args):
+        """Queue an event that replaces any undelivered event with the same key"""
+        with self._latest_lock:
+            self._latest[key] = (next(self._sequence), handler, args)
+    
+    def wrap(self, handler):
+        """Return a thread-safe callback that posts to handler"""
+        return lambda *args: self.post(handler, *args)
+    
+    def wrap_latest(self, key, handler):
+        """Return a thread-safe callback whose events collapse to the newest"""
+        return lambda *args: self.post_latest(key, handler, *args)
+    
+    def _drain(self):
+        """Deliver queued events in the order they were posted until the time budget is spent"""
+        if not self._running:
+            return
+        
+        # Events posted after this point wait for the next drain, so an ordered
+        # event never overtakes a coalesced one posted before it
+        with self._latest_lock:
+            latest, self._latest = self._latest, {}
+            horizon = next(self._sequence)
+        coalesced = sorted(latest.items(), key=lambda item: item[1][0], reverse=True)
+        
+        deadline = time.monotonic() + self.budget
+        while time.monotonic() < deadline:
+            event = self._next_ordered(horizon)
+            if coalesced and (event is None or coalesced[-1][1][0] < event[0]):
+                _, (_, handler, args) = coalesced.pop()
+            elif event is not None:
+                self._held = None
+                _, handler, args = event
+            else:
+                break
+            self._deliver(handler, args)
+        
+        # Coalesced events the budget did not reach stay queued unless a newer one replaced them
+        if coalesced:
+            with self._latest_lock:
+                for key, event in coalesced:
+                    self._latest.setdefault(key, event)
+        
+        self.root.after(self.interval, self._drain)
+    
+    def _next_ordered(self, horizon):
+        """Peek at the next ordered event posted before horizon, or None"""
+        if self._held is None:
+            try:
+                self._held = self._events.get_nowait()
+            except queue.Empty:
+                return None
+        return self._held if self._held[0] < horizon else None
+    
+    def _deliver(self, handler, args):
+        """Run one event, keeping the drain loop alive if it fails"""
+        try:
+            handler(*args)
+        except Exception:
+            logger.exception("UI event error in %s", getattr(handler, '__name__', handler))
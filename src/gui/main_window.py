@@ -3,48 +3,80 @@ Main GUI window for the file downloader application
 """
 
 import os
+import time
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import customtkinter as ctk
 
-from config.settings import *
-from src.gui.components import *
+from config.settings import (
+    APP_NAME, WINDOW_SIZE, MIN_WINDOW_SIZE, APPEARANCE_MODE, COLOR_THEME,
+    FONTS, DEFAULT_DOWNLOAD_FOLDER, SYNC_MODE_DEFAULT, PIPELINE_MODE_DEFAULT, FAILURE_REPORT_LINES
+)
+from src.gui.components import ScrollableFileList, ProgressDisplay, StatusDisplay, ControlButtonGroup
+from src.gui.event_bridge import UIEventBridge
 from src.core.scanner import DirectoryScanner
 from src.core.downloader import DownloadManager
-from src.utils.file_utils import is_valid_url
+from src.core.pipeline import FilePipeline
+from src.utils.file_utils import is_valid_url, format_size
+from src.utils.network_utils import create_network_manager
 
 
 class MainWindow:
     """Main application window"""
     
     def __init__(self):
+        # Apply theme before the first widget is created
+        ctk.set_appearance_mode(APPEARANCE_MODE)
+        ctk.set_default_color_theme(COLOR_THEME)
+        
         # Initialize main window
         self.root = ctk.CTk()
         self.root.title(APP_NAME)
         self.root.geometry(WINDOW_SIZE)
         self.root.minsize(*MIN_WINDOW_SIZE)
         
-        # Initialize core components
-        self.scanner = DirectoryScanner()
-        self.downloader = DownloadManager()
+        # Initialize core components sharing one connection pool
+        self.network_manager = create_network_manager()
+        self.scanner = DirectoryScanner(self.network_manager)
+        self.downloader = DownloadManager(self.network_manager)
+        
+        # Worker callbacks reach widgets only through the Tk loop
+        self.ui_events = UIEventBridge(self.root)
         
         # Setup callbacks
         self._setup_callbacks()
         
         # GUI variables
         self.download_folder = tk.StringVar(value=DEFAULT_DOWNLOAD_FOLDER)
+        self.sync_mode = tk.BooleanVar(value=SYNC_MODE_DEFAULT)
+        self.pipeline_mode = tk.BooleanVar(value=PIPELINE_MODE_DEFAULT)
         
         # Build UI
         self._build_ui()
     
     def _setup_callbacks(self):
-        """Setup callbacks for core components"""
-        self.scanner.set_progress_callback(self._on_scan_progress)
-        self.scanner.set_update_callback(self._on_scan_update)
+        """Setup callbacks for core components, marshalled onto the Tk loop"""
+        self.scanner.set_progress_callback(self._post_scan_progress)
+        self.scanner.set_update_callback(self._post_scan_update)
         
-        self.downloader.set_progress_callback(self._on_download_progress)
-        self.downloader.set_error_callback(self._on_download_error)
-        self.downloader.set_completion_callback(self._on_download_complete)
+        self.downloader.set_progress_callback(
+            self.ui_events.wrap_latest("download_progress", self._on_download_progress)
+        )
+        self.downloader.set_error_callback(self.ui_events.wrap(self._on_download_error))
+        self.downloader.set_completion_callback(self.ui_events.wrap(self._on_download_complete))
+    
+    def _post_scan_progress(self, status_type, message):
+        """Queue a scan status; intermediate "scanning" messages collapse to the newest"""
+        if status_type == "scanning":
+            self.ui_events.post_latest("scan_status", self._on_scan_progress, status_type, message)
+        else:
+            self.ui_events.post(self._on_scan_progress, status_type, message)
+    
+    def _post_scan_update(self, folder_path, folders, files):
+        """Queue a scan update with the index of its first file"""
+        # Called with the scanner's results lock held, so file_links ends with files
+        start_index = len(self.scanner.file_links) - len(files)
+        self.ui_events.post(self._on_scan_update, folder_path, folders, files, start_index)
     
     def _build_ui(self):
         """Build the user interface"""
@@ -130,6 +162,12 @@ class MainWindow:
             height=35, width=120, state="disabled"
         )
         self.scan_controls.pack_button("cancel", side="left", padx=(5, 10), pady=10)
+        
+        self.scan_controls.add_button(
+            "load_snapshot", "📂 Mở lần quét trước", self._load_previous_scan,
+            height=35, width=160
+        )
+        self.scan_controls.pack_button("load_snapshot", side="right", padx=(5, 10), pady=10)
     
     def _build_folder_section(self, parent):
         """Build folder selection section"""
@@ -188,6 +226,16 @@ class MainWindow:
         )
         self.select_all_btn.pack(side="right", padx=(10, 0))
         
+        self.select_changed_btn = ctk.CTkButton(
+            list_header_frame,
+            text="🆕 Chọn tệp mới/thay đổi",
+            command=self._select_changed,
+            height=30,
+            width=170,
+            state="disabled"
+        )
+        self.select_changed_btn.pack(side="right", padx=(10, 0))
+        
         # File list
         self.file_list = ScrollableFileList(list_frame, height=250)
         self.file_list.pack(fill="both", expand=True, padx=20, pady=(0, 10))
@@ -219,6 +267,22 @@ class MainWindow:
         )
         self.control_buttons.pack_button("download_all", side="left", padx=(0, 10), pady=20)
         
+        sync_checkbox = ctk.CTkCheckBox(
+            self.control_buttons,
+            text="🔄 Chỉ tải tệp mới/thay đổi",
+            variable=self.sync_mode,
+            font=ctk.CTkFont(size=FONTS['normal'][1])
+        )
+        sync_checkbox.pack(side="left", padx=(10, 10), pady=20)
+        
+        pipeline_checkbox = ctk.CTkCheckBox(
+            self.control_buttons,
+            text="⚡ Tải ngay khi quét",
+            variable=self.pipeline_mode,
+            font=ctk.CTkFont(size=FONTS['normal'][1])
+        )
+        pipeline_checkbox.pack(side="left", padx=(0, 10), pady=20)
+        
         self.control_buttons.add_button(
             "stop", "⏹️ Dừng", self._stop_all,
             height=45, state="disabled"
@@ -237,16 +301,57 @@ class MainWindow:
             messagebox.showerror("Lỗi", "URL không hợp lệ!")
             return
         
-        # Clear previous results
-        self.file_list.clear_list()
+        # Download every file as soon as the scan finds it
+        pipeline = None
+        if self.pipeline_mode.get():
+            download_folder = self.download_folder.get()
+            if not download_folder:
+                messagebox.showerror("Lỗi", "Vui lòng chọn thư mục lưu!")
+                return
+            os.makedirs(download_folder, exist_ok=True)
+            
+            pipeline = FilePipeline()
+            self.downloader.start_pipeline(pipeline, download_folder, sync=self.sync_mode.get())
+            self.control_buttons.configure_button("download_selected", state="disabled")
+            self.control_buttons.configure_button("download_all", state="disabled")
+            self.control_buttons.configure_button("stop", state="normal")
         
         # Update button states
         self.scan_btn.configure(text="🔄 Đang quét...", state="disabled")
         self.scan_controls.configure_button("pause", state="normal")
         self.scan_controls.configure_button("cancel", state="normal")
         
-        # Start scanning
-        self.scanner.start_scan(url)
+        # Start scanning; the file list reads names straight from the new index
+        self.scanner.start_scan(url, pipeline)
+        self.file_list.clear_list(self.scanner.file_links.names)
+        self.select_changed_btn.configure(state="disabled")
+    
+    def _load_previous_scan(self):
+        """Show the saved results of the last scan of the URL without crawling again"""
+        url = self.url_entry.get().strip()
+        if not url or not is_valid_url(url):
+            messagebox.showerror("Lỗi", "URL không hợp lệ!")
+            return
+        if self.scanner.is_scanning:
+            return
+        
+        scan_results = self.scanner.load_snapshot(url)
+        if scan_results is None:
+            messagebox.showinfo("Thông báo", "Chưa có kết quả quét đã lưu cho URL này.")
+            return
+        
+        self.file_list.clear_list(scan_results["file_links"].names)
+        self.select_changed_btn.configure(state="disabled")
+        for folder_path, entry in scan_results["folder_structure"].items():
+            if entry["files"] or entry["folders"]:
+                self._on_scan_update(folder_path, entry["folders"], entry["files"], entry["files"].start)
+        
+        self.status_display.update_status(
+            "success",
+            f"📂 Đã mở lần quét lúc {time.strftime('%d/%m/%Y %H:%M', time.localtime(scan_results['created_at']))}: "
+            f"{scan_results['total_files']} tệp ({format_size(scan_results['total_bytes'])}) "
+            f"từ {scan_results['total_folders']} thư mục"
+        )
     
     def _pause_scan(self):
         """Pause scanning"""
@@ -280,8 +385,7 @@ class MainWindow:
     
     def _toggle_select_all(self):
         """Toggle select all files"""
-        selected_indices = self.file_list.get_selected_indices()
-        all_selected = len(selected_indices) == len(self.file_list.selected_files)
+        all_selected = self.file_list.selected_count == self.file_list.file_count
         
         self.file_list.select_all_files(not all_selected)
         
@@ -289,6 +393,13 @@ class MainWindow:
             text="❌ Bỏ chọn tất cả" if not all_selected else "✅ Chọn tất cả"
         )
     
+    def _select_changed(self):
+        """Select the files that are new or changed since the previous scan"""
+        changes = self.scanner.changes
+        if not changes:
+            return
+        self.file_list.select_files(entry.position for entry in changes["added"] + changes["changed"])
+    
     def _download_all(self):
         """Download all files"""
         self.file_list.select_all_files(True)
@@ -320,7 +431,9 @@ class MainWindow:
         self.control_buttons.configure_button("stop", state="normal")
         
         # Start download
-        self.downloader.start_download(selected_files, download_folder)
+        self.downloader.start_download(
+            selected_files, download_folder, sync=self.sync_mode.get(), listing=scan_results["file_links"]
+        )
     
     def _stop_all(self):
         """Stop all operations"""
@@ -346,23 +459,29 @@ class MainWindow:
         elif status_type == "completed":
             self._reset_scan_buttons()
             scan_results = self.scanner.get_scan_results()
-            self.status_display.update_status(
-                "success", 
-                f"✅ Hoàn tất! Tìm thấy {scan_results['total_files']} tệp từ {scan_results['total_folders']} thư mục"
+            message = (
+                f"✅ Hoàn tất! Tìm thấy {scan_results['total_files']} tệp ({format_size(scan_results['total_bytes'])}) "
+                f"từ {scan_results['total_folders']} thư mục "
+                f"({scan_results['folders_per_second']:.1f} thư mục/giây)"
             )
+            if scan_results['failed_folders']:
+                message += f" - {len(scan_results['failed_folders'])} thư mục lỗi"
+            changes = scan_results['changes']
+            if changes:
+                message += (
+                    f" - so với lần trước: +{changes['added']} mới, ~{changes['changed']} thay đổi, "
+                    f"-{changes['removed']} đã xóa"
+                )
+                self.select_changed_btn.configure(state="normal" if changes['added'] or changes['changed'] else "disabled")
+            self.status_display.update_status("success", message)
     
-    def _on_scan_update(self, folder_path, folders, files):
+    def _on_scan_update(self, folder_path, folders, files, start_index):
         """Handle real-time scan updates"""
         # Add folder header if needed
         self.file_list.add_folder_header(folder_path, len(files), len(folders))
         
         # Add files to list
-        scan_results = self.scanner.get_scan_results()
-        start_index = len(scan_results["file_links"]) - len(files)
-        
-        for i, file_info in enumerate(files):
-            file_index = start_index + i
-            self.file_list.add_file_item(file_info, file_index)
+        self.file_list.add_file_items(folder_path, len(files), start_index)
         
         # Update folder count
         self.file_list.update_folder_count(folder_path, len(files), len(folders))
@@ -372,8 +491,8 @@ class MainWindow:
         self.progress_display.update_progress(progress_data)
     
     def _on_download_error(self, error_message):
-        """Handle download errors"""
-        messagebox.showerror("Lỗi tải xuống", error_message)
+        """Show a file that failed for good; all failures are listed once the download completes"""
+        self.status_display.update_status("error", error_message)
     
     def _on_download_complete(self):
         """Handle download completion"""
@@ -383,9 +502,53 @@ class MainWindow:
         self.control_buttons.configure_button("stop", state="disabled")
         
         # Update progress
-        self.progress_display.update_progress("✅ Tải xuống hoàn tất!")
-        messagebox.showinfo("Thành công", "Tải xuống hoàn tất!")
+        failures = self.downloader.get_failure_report()
+        message = f"⚠️ Tải xuống xong, {len(failures)} tệp lỗi." if failures else "✅ Tải xuống hoàn tất!"
+        stats = self.downloader.get_download_stats()
+        if stats['skipped_files']:
+            message += f" Bỏ qua {stats['skipped_files']} tệp đã cập nhật ({format_size(stats['skipped_bytes'])})"
+        self.progress_display.update_progress(message)
+        
+        if not failures:
+            messagebox.showinfo("Thành công", message)
+            return
+        
+        # One report for all files that failed for good
+        details = "\n".join(
+            f"• {failure['name']} ({failure['attempts']} lần thử): {failure['error']}"
+            for failure in failures[:FAILURE_REPORT_LINES]
+        )
+        if len(failures) > FAILURE_REPORT_LINES:
+            details += f"\n... và {len(failures) - FAILURE_REPORT_LINES} tệp khác"
+        messagebox.showwarning("Tải xuống có lỗi", f"{message}\n\n{details}")
+    
+    def _offer_resume(self):
+        """Offer to continue the download run that was interrupted last time"""
+        store = self.downloader.job_store
+        run = store.unfinished_run() if store else None
+        if run is None:
+            return
+        
+        summary = store.summary(run['id'])
+        remaining = summary['pending'] + summary['active']
+        resume = messagebox.askyesno(
+            "Tiếp tục tải",
+            f"Lần trước còn {remaining}/{summary['total_files']} tệp chưa tải xong vào {run['download_folder']}.\n"
+            "Tiếp tục tải?"
+        )
+        if not resume:
+            store.finish_run(run['id'], "abandoned")
+            return
+        
+        if self.downloader.resume_download(run['id']):
+            self.download_folder.set(run['download_folder'])
+            self.sync_mode.set(bool(run['sync']))
+            self.control_buttons.configure_button("download_selected", state="disabled")
+            self.control_buttons.configure_button("download_all", state="disabled")
+            self.control_buttons.configure_button("stop", state="normal")
     
     def run(self):
         """Run the application"""
+        self.ui_events.start()
+        self.root.after(0, self._offer_resume)
         self.root.mainloop()
@@ -0,0 +1,300 @@
+"""
+Asyncio network backend built on aiohttp
+"""
+
+import os
+import asyncio
+import aiohttp
+from urllib.parse import urlsplit
+from config.settings import (
+    REQUEST_TIMEOUT, DOWNLOAD_TIMEOUT, USER_AGENT, ASYNC_MAX_IN_FLIGHT,
+    HTTP_POOL_PER_HOST, LISTING_CHUNK_SIZE, PART_SUFFIX, RESUME_MIN_SIZE
+)
+from src.utils.network_utils import NetworkError, RangeNotSupportedError, ChunkSizer, text_decoder
+from src.utils.file_utils import preallocate_file, reserve_space, positional_write
+from src.utils.listing_parser import DirectoryListingParser, parse_directory_html
+from src.utils.download_journal import DownloadJournal, DownloadCancelledError
+from src.utils.checksums import IntegrityError
+from src.utils.rate_limiter import BandwidthLimiter
+from src.utils.retry import RetryScheduler, http_status, retry_after_seconds
+
+
+class AsyncNetworkManager:
+    """Handle all network operations on an asyncio event loop"""
+    
+    is_async = True
+    
+    def __init__(self):
+        self.headers = {'User-Agent': USER_AGENT}
+        self.timeout = REQUEST_TIMEOUT
+        self.max_in_flight = ASYNC_MAX_IN_FLIGHT
+        self.bandwidth = BandwidthLimiter()
+        self.retry = RetryScheduler()
+        self._sessions = {}
+    
+    async def __aenter__(self):
+        self._session()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    def _session(self):
+        """Get the client session bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_in_flight,
+                limit_per_host=HTTP_POOL_PER_HOST
+            )
+            session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+            self._sessions[loop] = session
+        return session
+    
+    async def close(self):
+        """Close the client session of the running event loop"""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+    
+    async def get_page_content(self, url):
+        """Get page content with error handling"""
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with self._session().get(url, timeout=timeout) as response:
+                response.raise_for_status()
+                return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise NetworkError(f"Failed to fetch {url}: {str(e)}", http_status(e), retry_after_seconds(e))
+    
+    async def fetch_directory_listing(self, url, etag=None, last_modified=None):
+        """Fetch a listing page, parsing it while the body streams in"""
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with self._session().get(url, headers=headers, timeout=timeout) as response:
+                if response.status == 304:
+                    return {'not_modified': True, 'etag': etag, 'last_modified': last_modified}
+                
+                response.raise_for_status()
+                # Resolve links against the final URL when the server redirected (e.g. to add a slash)
+                final_url = str(response.url)
+                parser = DirectoryListingParser(final_url)
+                decoder = text_decoder(response.charset)
+                async for chunk in response.content.iter_chunked(LISTING_CHUNK_SIZE):
+                    parser.feed(decoder.decode(chunk))
+                parser.feed(decoder.decode(b"", final=True))
+                folders, files = parser.close()
+                
+                return {
+                    'not_modified': False,
+                    'url': final_url,
+                    'folders': folders,
+                    'files': files,
+                    'etag': response.headers.get('etag'),
+                    'last_modified': response.headers.get('last-modified')
+                }
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise NetworkError(f"Failed to fetch {url}: {str(e)}", http_status(e), retry_after_seconds(e))
+    
+    def parse_directory_links(self, html_content, base_url):
+        """Parse HTML content to extract file and folder links"""
+        return parse_directory_html(html_content, base_url)
+    
+    async def get_file_size(self, url):
+        """Get file size from URL headers"""
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with self._session().head(url, timeout=timeout) as response:
+                return int(response.headers.get('content-length', 0))
+        except:
+            return 0
+    
+    async def get_file_info(self, url):
+        """Get size, ETag and Last-Modified of a remote file"""
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with self._session().head(url, timeout=timeout, allow_redirects=True) as response:
+                response.raise_for_status()
+                return {
+                    'size': int(response.headers.get('content-length', 0)),
+                    'etag': response.headers.get('etag'),
+                    'last_modified': response.headers.get('last-modified')
+                }
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise NetworkError(f"Failed to fetch {url}: {str(e)}", http_status(e), retry_after_seconds(e))
+    
+    async def get_file_infos(self, urls):
+        """Get file info for many URLs concurrently; failures become None"""
+        async def file_info_or_none(url):
+            try:
+                return await self.get_file_info(url)
+            except Exception:
+                return None
+        
+        return await asyncio.gather(*(file_info_or_none(url) for url in urls))
+    
+    async def download_file_stream(self, url, file_path, progress_callback=None, should_stop=None, digest=None):
+        """Download file via a resumable .part file and return its size and validators
+        
+        A StreamDigest passed as digest is fed the data as it is written.
+        """
+        try:
+            async with self._session().get(url, timeout=self._download_timeout()) as response:
+                response.raise_for_status()
+                
+                total_size = int(response.headers.get('content-length', 0))
+                accepts_ranges = response.headers.get('accept-ranges', '').lower() == 'bytes'
+                etag = response.headers.get('etag')
+                last_modified = response.headers.get('last-modified')
+                file_info = {'size': total_size, 'etag': etag, 'last_modified': last_modified}
+                
+                journal = DownloadJournal.load(file_path)
+                if journal and not (accepts_ranges and journal.matches(url, total_size, etag, last_modified)):
+                    # Remote file changed (or lost range support); restart from byte zero
+                    journal.discard()
+                    journal = None
+                
+                if not accepts_ranges or total_size < RESUME_MIN_SIZE:
+                    await self._download_single(response, file_path, total_size, progress_callback, should_stop, digest)
+                    return file_info
+                
+                if journal is None:
+                    journal = DownloadJournal(file_path, url, total_size, etag, last_modified)
+                    preallocate_file(journal.part_path, total_size)
+                
+                # One stream per file: the event loop already overlaps many files
+                ranges = journal.missing_ranges([(0, total_size - 1)])
+                if not (ranges and ranges[0][0] == 0):
+                    response.close()
+                    response = None
+                try:
+                    await self._download_ranges(url, journal, ranges, progress_callback, should_stop, digest, response)
+                except RangeNotSupportedError:
+                    # Server advertised ranges but ignored them; use one stream
+                    journal.discard()
+                    async with self._session().get(url, timeout=self._download_timeout()) as response:
+                        response.raise_for_status()
+                        await self._download_single(response, file_path, total_size, progress_callback, should_stop, digest)
+                    return file_info
+            
+            journal.finalize()
+            return file_info
+        except (DownloadCancelledError, IntegrityError):
+            raise
+        except Exception as e:
+            raise NetworkError(f"Download failed: {str(e)}", http_status(e), retry_after_seconds(e))
+    
+    def _download_timeout(self):
+        """Per-read timeouts for a body that may stream for a long time"""
+        return aiohttp.ClientTimeout(sock_connect=DOWNLOAD_TIMEOUT, sock_read=DOWNLOAD_TIMEOUT)
+    
+    async def _throttle(self, host, length):
+        """Wait out the bandwidth limit for length bytes"""
+        if self.bandwidth.active:
+            delay = self.bandwidth.reserve(host, length)
+            if delay > 0:
+                await asyncio.sleep(delay)
+    
+    async def _download_single(self, response, file_path, total_size, progress_callback, should_stop, digest=None):
+        """Stream a whole response body into a .part file, then move it into place"""
+        part_path = file_path + PART_SUFFIX
+        host = urlsplit(str(response.url)).hostname
+        downloaded = 0
+        sizer = ChunkSizer()
+        
+        try:
+            with open(part_path, 'wb') as file:
+                reserve_space(file.fileno(), total_size)
+                while True:
+                    chunk = await response.content.read(sizer.size)
+                    if not chunk:
+                        break
+                    if should_stop and should_stop():
+                        raise DownloadCancelledError(f"Stopped downloading {file_path}")
+                    
+                    await self._throttle(host, len(chunk))
+                    file.write(chunk)
+                    if digest:
+                        digest.update(chunk)
+                    downloaded += len(chunk)
+                    sizer.update(len(chunk))
+                    
+                    if progress_callback:
+                        progress_callback(downloaded, total_size)
+                
+                if total_size and downloaded != total_size:
+                    raise IntegrityError(f"Truncated at byte {downloaded} of {total_size}")
+                file.truncate()  # drop preallocated space the body did not fill
+        except BaseException:
+            # Without range support the partial data cannot be resumed
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        
+        os.replace(part_path, file_path)
+    
+    async def _download_ranges(self, url, journal, ranges, progress_callback, should_stop, digest=None, response=None):
+        """Fetch the missing byte ranges one after another into the .part file"""
+        total_size = journal.total_size
+        progress = {'downloaded': journal.completed_bytes()}
+        
+        def report(length):
+            progress['downloaded'] += length
+            if progress_callback:
+                progress_callback(progress['downloaded'], total_size)
+        
+        try:
+            for start, end in ranges:
+                if response is not None:
+                    # The body already requested starts at byte zero
+                    await self._write_range(response, journal, start, end, report, should_stop, digest)
+                    response = None
+                    continue
+                
+                headers = {'Range': f"bytes={start}-{end}"}
+                async with self._session().get(url, headers=headers, timeout=self._download_timeout()) as range_response:
+                    range_response.raise_for_status()
+                    if range_response.status != 206:
+                        raise RangeNotSupportedError(f"Server ignored Range request for {url}")
+                    await self._write_range(range_response, journal, start, end, report, should_stop, digest)
+        finally:
+            journal.save(force=True)
+    
+    async def _write_range(self, response, journal, start, end, report, should_stop, digest=None):
+        """Write the body of one inclusive byte range at its offset"""
+        offset = start
+        host = urlsplit(str(response.url)).hostname
+        sizer = ChunkSizer()
+        fd = os.open(journal.part_path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+        try:
+            while offset <= end:
+                chunk = await response.content.read(min(sizer.size, end + 1 - offset))
+                if not chunk:
+                    break
+                if should_stop and should_stop():
+                    raise DownloadCancelledError(f"Stopped downloading {journal.file_path}")
+                
+                await self._throttle(host, len(chunk))
+                positional_write(fd, chunk, offset)
+                if digest:
+                    digest.feed(fd, start, offset, chunk)
+                offset += len(chunk)
+                sizer.update(len(chunk))
+                report(len(chunk))
+                
+                if journal.save_due():
+                    journal.add_range(start, offset)
+                    journal.save()
+        finally:
+            os.close(fd)
+            journal.add_range(start, offset)
+        
+        if offset != end + 1:
+            raise IntegrityError(f"Segment {start}-{end} truncated at byte {offset}")
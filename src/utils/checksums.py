@@ -0,0 +1,121 @@
+"""
+Streaming file hashes and checksum file parsing for download verification
+"""
+
+import re
+import hashlib
+import threading
+from config.settings import HASH_ALGORITHM, CHECKSUM_READ_SIZE
+from src.utils.file_utils import positional_read
+
+# Digest length in hex characters -> algorithm of checksum files without a name
+HEX_LENGTHS = {32: "md5", 40: "sha1", 64: "sha256", 128: "sha512"}
+
+GNU_LINE = re.compile(r"^\\?([0-9a-fA-F]{32,128})\s+[ *]?(.+)$")  # sha256sum output
+BSD_LINE = re.compile(r"^(\w+)\s*\((.+)\)\s*=\s*([0-9a-fA-F]{32,128})$")  # shasum --tag output
+BARE_LINE = re.compile(r"^([0-9a-fA-F]{32,128})$")  # a sidecar holding only the digest
+
+
+class IntegrityError(Exception):
+    """Raised when a downloaded file is truncated or does not match its checksum"""
+    pass
+
+
+def new_hash(algorithm):
+    """Create a hash object; xxh* names need the optional xxhash package"""
+    if algorithm.startswith("xxh"):
+        import xxhash
+        return getattr(xxhash, algorithm)()
+    return hashlib.new(algorithm)
+
+
+def storage_algorithm():
+    """The configured hash for stored digests, falling back to SHA-256 without xxhash"""
+    if HASH_ALGORITHM.startswith("xxh"):
+        try:
+            import xxhash  # noqa: F401
+        except ImportError:
+            return "sha256"
+    return HASH_ALGORITHM
+
+
+def parse_checksum_text(text):
+    """Parse sha256sum/md5sum style lines into {path: (algorithm, hex digest)}
+    
+    A bare digest (a sidecar holding only the hash) is returned under the key "".
+    """
+    checksums = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        
+        match = BSD_LINE.match(line)
+        if match:
+            algorithm = match.group(1).lower().replace("-", "")
+            checksums[match.group(2)] = (algorithm, match.group(3).lower())
+            continue
+        
+        match = GNU_LINE.match(line) or BARE_LINE.match(line)
+        if match:
+            digest = match.group(1).lower()
+            path = match.group(2).strip() if match.re is GNU_LINE else ""
+            if path.startswith("./"):
+                path = path[2:]
+            checksums[path] = (HEX_LENGTHS.get(len(digest)), digest)
+    
+    return {path: value for path, value in checksums.items() if value[0]}
+
+
+class StreamDigest:
+    """Hashes of a file computed from its chunks while they are written
+    
+    Sequential writers call update(). Range writers call feed(): each chunk
+    is hashed inline when it continues the hashed prefix, and a segment that
+    the prefix reaches mid-way catches up by reading back its own data.
+    finish() hashes whatever is left, e.g. ranges kept from an earlier run.
+    """
+    
+    def __init__(self, algorithms):
+        self.hashes = {algorithm: new_hash(algorithm) for algorithm in algorithms}
+        self.position = 0  # bytes hashed so far, always a prefix of the file
+        self._lock = threading.Lock()
+    
+    def update(self, data):
+        """Hash the next chunk of a sequentially written file"""
+        for hash_object in self.hashes.values():
+            hash_object.update(data)
+        self.position += len(data)
+    
+    def feed(self, fd, segment_start, offset, data):
+        """Hash a chunk written at offset by a segment whose data is contiguous from segment_start"""
+        end = offset + len(data)
+        if not segment_start <= self.position < end:
+            return  # not at the hashed prefix yet (finish() reads it back)
+        
+        with self._lock:
+            if not segment_start <= self.position < end:
+                return
+            while self.position < offset:
+                chunk = positional_read(fd, min(CHECKSUM_READ_SIZE, offset - self.position), self.position)
+                if not chunk:
+                    return
+                self.update(chunk)
+            self.update(memoryview(data)[self.position - offset:])
+    
+    def finish(self, file_path, size):
+        """Hash the rest of the file from disk and return {algorithm: hex digest}"""
+        with self._lock:
+            if self.position < size:
+                with open(file_path, 'rb') as file:
+                    file.seek(self.position)
+                    buffer = memoryview(bytearray(CHECKSUM_READ_SIZE))
+                    while True:
+                        count = file.readinto(buffer)
+                        if not count:
+                            break
+                        self.update(buffer[:count])
+            return self.hexdigests()
+    
+    def hexdigests(self):
+        return {algorithm: hash_object.hexdigest() for algorithm, hash_object in self.hashes.items()}
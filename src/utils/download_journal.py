@@ -0,0 +1,136 @@
+"""
+On-disk journal for resumable partial downloads
+"""
+
+import os
+import json
+import time
+import threading
+from config.settings import PART_SUFFIX, JOURNAL_SUFFIX, JOURNAL_SAVE_INTERVAL
+
+
+class DownloadCancelledError(Exception):
+    """Raised when a download is stopped before it completes"""
+    pass
+
+
+class DownloadJournal:
+    """Track completed byte ranges and validators of a .part file"""
+    
+    def __init__(self, file_path, url, total_size, etag=None, last_modified=None, ranges=None):
+        self.file_path = file_path
+        self.part_path = file_path + PART_SUFFIX
+        self.journal_path = self.part_path + JOURNAL_SUFFIX
+        self.url = url
+        self.total_size = total_size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.ranges = [list(r) for r in ranges or []]
+        self._lock = threading.Lock()
+        self._last_save = 0
+    
+    @classmethod
+    def load(cls, file_path):
+        """Load the journal of a partial download, if one exists"""
+        journal_path = file_path + PART_SUFFIX + JOURNAL_SUFFIX
+        try:
+            with open(journal_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            return cls(
+                file_path,
+                data['url'],
+                data['total_size'],
+                data.get('etag'),
+                data.get('last_modified'),
+                data.get('ranges')
+            )
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def matches(self, url, total_size, etag, last_modified):
+        """Check whether the partial data still belongs to the remote file"""
+        if url != self.url or total_size != self.total_size:
+            return False
+        if not os.path.exists(self.part_path):
+            return False
+        if etag or self.etag:
+            return etag == self.etag
+        if last_modified or self.last_modified:
+            return last_modified == self.last_modified
+        return True
+    
+    def add_range(self, start, end):
+        """Mark bytes [start, end) as written and merge overlapping ranges"""
+        if end <= start:
+            return
+        
+        with self._lock:
+            merged = []
+            for range_start, range_end in sorted(self.ranges + [[start, end]]):
+                if merged and range_start <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], range_end)
+                else:
+                    merged.append([range_start, range_end])
+            self.ranges = merged
+    
+    def completed_bytes(self):
+        """Get the number of bytes already on disk"""
+        with self._lock:
+            return sum(end - start for start, end in self.ranges)
+    
+    def missing_ranges(self, segments):
+        """Intersect inclusive segments with the bytes not yet written"""
+        with self._lock:
+            completed = [tuple(r) for r in self.ranges]
+        
+        missing = []
+        for segment_start, segment_end in segments:
+            cursor = segment_start
+            for start, end in completed:
+                if end <= cursor or start > segment_end:
+                    continue
+                if start > cursor:
+                    missing.append((cursor, start - 1))
+                cursor = max(cursor, end)
+            if cursor <= segment_end:
+                missing.append((cursor, segment_end))
+        return missing
+    
+    def save_due(self):
+        """Check whether the throttled save interval has elapsed"""
+        return time.time() - self._last_save >= JOURNAL_SAVE_INTERVAL
+    
+    def save(self, force=False):
+        """Persist the journal, throttled to JOURNAL_SAVE_INTERVAL"""
+        if not force and not self.save_due():
+            return
+        
+        with self._lock:
+            self._last_save = time.time()
+            data = {
+                'url': self.url,
+                'total_size': self.total_size,
+                'etag': self.etag,
+                'last_modified': self.last_modified,
+                'ranges': self.ranges
+            }
+            temp_path = self.journal_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+            os.replace(temp_path, self.journal_path)
+    
+    def discard(self):
+        """Remove the partial data and its journal"""
+        for path in (self.part_path, self.journal_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def finalize(self):
+        """Move the completed .part file into place and drop the journal"""
+        os.replace(self.part_path, self.file_path)
+        try:
+            os.remove(self.journal_path)
+        except OSError:
+            pass
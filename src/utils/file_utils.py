@@ -45,6 +45,56 @@ def create_safe_path(download_folder, relative_path, filename):
         return os.path.join(download_folder, filename)
 
 
+def reserve_space(fd, size):
+    """Allocate disk blocks for size bytes up front where the platform supports it"""
+    if size > 0 and hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            pass  # not supported by this file system; blocks are allocated on write
+
+
+def preallocate_file(file_path, size):
+    """Create a file of the given size ready for positional writes"""
+    with open(file_path, 'wb') as file:
+        reserve_space(file.fileno(), size)
+        file.truncate(size)
+
+
+def positional_write(fd, data, offset):
+    """Write data at an absolute offset of an open file descriptor"""
+    if hasattr(os, 'pwrite'):
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+    else:
+        # Windows has no pwrite; each segment owns its descriptor
+        os.lseek(fd, offset, os.SEEK_SET)
+        os.write(fd, data)
+
+
+def positional_read(fd, size, offset):
+    """Read up to size bytes at an absolute offset of an open file descriptor"""
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def parse_http_date(value):
+    """Convert an HTTP date header to a Unix timestamp"""
+    if not value:
+        return None
+    
+    from email.utils import parsedate_to_datetime  # pulls in socket; only needed in sync mode
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
 def is_valid_url(url):
     """Check if URL is valid"""
     try:
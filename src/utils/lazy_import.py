@@ -0,0 +1,28 @@
+"""
+Deferred module imports to keep startup fast
+"""
+
+import sys
+import importlib.util
+
+
+def lazy_import(name):
+    """Return a module that is only executed on first attribute access
+    
+    The first access should happen on one thread (e.g. while constructing a
+    manager) since module execution is not guarded against concurrent loads.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,175 @@
+"""
+Streaming parser for autoindex directory listings (nginx, Apache, lighttpd)
+"""
+
+import re
+import html
+from datetime import datetime, timezone
+from functools import lru_cache
+from urllib.parse import urljoin, urlsplit
+from src.utils.url_utils import canonical_url, canonical_folder
+
+ANCHOR_PATTERN = re.compile(
+    r'<a\s[^>]*?href\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))[^>]*>(.*?)</a\s*>',
+    re.IGNORECASE | re.DOTALL
+)
+TAG_PATTERN = re.compile(r'<[^>]*>')
+DATE_PATTERN = re.compile(
+    r'(\d{1,2}-[A-Za-z]{3}-\d{4} \d{1,2}:\d{2}(?::\d{2})?'  # nginx, Apache FancyIndexing
+    r'|\d{4}-\d{2}-\d{2}[ T]\d{1,2}:\d{2}(?::\d{2})?'  # Apache HTMLTable
+    r'|\d{4}-[A-Za-z]{3}-\d{1,2} \d{1,2}:\d{2}(?::\d{2})?)'  # lighttpd
+)
+SIZE_PATTERN = re.compile(r'^(?:\d+(?:\.\d+)?\s?[KMGTP]?i?B?|-)$', re.IGNORECASE)
+SIZE_VALUE_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)\s?([KMGTP]?)i?B?$', re.IGNORECASE)
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4, "P": 1024 ** 5}
+DATE_FORMATS = (
+    "%d-%b-%Y %H:%M", "%d-%b-%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S",
+    "%Y-%b-%d %H:%M", "%Y-%b-%d %H:%M:%S"
+)
+SIMPLE_HREF_PATTERN = re.compile(r'^[^:/?#.][^:?#]*$')
+SKIPPED_HREFS = ("", "../", "./", "/")
+SKIPPED_PREFIXES = ("?", "#")  # Apache sort links (?C=N;O=D) and in-page anchors
+
+
+class DirectoryListingParser:
+    """Incremental anchor extractor fed with decoded chunks of a listing page"""
+    
+    def __init__(self, base_url):
+        self.base_url = base_url
+        # urljoin is the hot spot on huge listings; plain relative hrefs
+        # only need the base folder prepended
+        parts = urlsplit(base_url)
+        self._base_folder = None
+        if parts.path.startswith("/") and not parts.query and not parts.fragment:
+            self._base_folder = base_url[:base_url.rfind("/") + 1]
+        self._canonical_folder = canonical_folder(base_url)
+        self.folders = []
+        self.files = []
+        self._buffer = ""
+        self._pending = None  # last anchor whose row text is still arriving
+    
+    def feed(self, text):
+        """Consume the next chunk of page text"""
+        self._buffer += text
+        position = 0
+        
+        while True:
+            match = ANCHOR_PATTERN.search(self._buffer, position)
+            if not match:
+                break
+            
+            if self._pending is not None:
+                self._emit(self._pending, self._buffer[position:match.start()])
+            self._pending = match.group(1) or match.group(2) or match.group(3) or ""
+            position = match.end()
+        
+        # Keep only text that may still belong to the pending row or a split anchor
+        self._buffer = self._buffer[position:]
+    
+    def close(self):
+        """Finish parsing and return (folders, files)"""
+        if self._pending is not None:
+            self._emit(self._pending, self._buffer)
+        self._pending = None
+        self._buffer = ""
+        return self.folders, self.files
+    
+    def _emit(self, href, row_text):
+        """Record one anchor together with the text that follows it"""
+        if "&" in href:
+            href = html.unescape(href)
+        
+        # Skip parent directory, sort and in-page links
+        if href in SKIPPED_HREFS or href.startswith(SKIPPED_PREFIXES):
+            return
+        
+        if self._base_folder and SIMPLE_HREF_PATTERN.match(href) and "/." not in href:
+            full_url = self._base_folder + href
+            name = href.rstrip("/")
+        else:
+            # Absolute, dotted or escaped hrefs count only when they name an
+            # entry of this folder: no other hosts, parents, queries or subtrees
+            full_url = canonical_url(urljoin(self.base_url, href))
+            if not full_url.startswith(self._canonical_folder):
+                return
+            name = full_url[len(self._canonical_folder):].rstrip("/")
+            if not name or "/" in name or "?" in name:
+                return
+        
+        if href.endswith("/"):  # It's a folder
+            self.folders.append({
+                "name": name,
+                "url": full_url
+            })
+        else:  # It's a file
+            file_info = {
+                "name": name,
+                "url": full_url,
+                "href": href
+            }
+            columns = parse_row_columns(row_text)
+            if columns:
+                modified_text, size_text = columns
+                modified = parse_listing_date(modified_text)
+                if modified is not None:
+                    file_info["modified"] = modified
+                size = parse_size(size_text)
+                if size is not None:
+                    file_info["size"] = size
+                    file_info["size_exact"] = size_text.isdigit()
+            self.files.append(file_info)
+
+
+def parse_row_columns(row_text):
+    """Extract (modified_text, size_text) from the text after a listing anchor"""
+    end = row_text.find("</tr>")
+    if end < 0:
+        end = row_text.find("\n")
+    if end >= 0:
+        row_text = row_text[:end]
+    
+    text = html.unescape(TAG_PATTERN.sub(" ", row_text))
+    date_match = DATE_PATTERN.search(text)
+    if not date_match:
+        return None
+    
+    size_text = None
+    for token in text[date_match.end():].split():
+        if SIZE_PATTERN.match(token):
+            size_text = token
+            break
+    return date_match.group(1), size_text
+
+
+def parse_size(size_text):
+    """Convert a listing size column such as 12345, 1.2K or 3.4 MiB to bytes"""
+    if not size_text or size_text == "-":
+        return None
+    if size_text.isdigit():
+        return int(size_text)
+    
+    match = SIZE_VALUE_PATTERN.match(size_text)
+    if not match:
+        return None
+    number, unit = match.groups()
+    return int(float(number) * SIZE_UNITS[unit.upper()])
+
+
+@lru_cache(maxsize=4096)
+def parse_listing_date(modified_text):
+    """Convert a listing date column to a Unix timestamp (UTC)"""
+    for date_format in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(modified_text, date_format)
+        except ValueError:
+            continue
+        return parsed.replace(tzinfo=timezone.utc).timestamp()
+    return None
+
+
+def parse_directory_html(html_content, base_url):
+    """Parse a complete listing page into (folders, files)"""
+    parser = DirectoryListingParser(base_url)
+    parser.feed(html_content)
+    return parser.close()
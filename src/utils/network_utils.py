@@ -2,84 +2,401 @@
 Network utilities for web scraping and downloading
 """
 
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-from config.settings import REQUEST_TIMEOUT, USER_AGENT
+import os
+import time
+import codecs
+import threading
+from urllib.parse import urlsplit
+from config.settings import (
+    REQUEST_TIMEOUT, DOWNLOAD_TIMEOUT, USER_AGENT, NETWORK_BACKEND,
+    CHUNK_SIZE, CHUNK_SIZE_MAX, CHUNK_TARGET_TIME,
+    HTTP_POOL_HOSTS, HTTP_POOL_PER_HOST, HTTP_MAX_RETRIES, HTTP_RETRY_BACKOFF,
+    SEGMENT_MIN_SIZE, SEGMENT_TARGET_SIZE, MAX_SEGMENTS_PER_FILE,
+    PART_SUFFIX, RESUME_MIN_SIZE, LISTING_CHUNK_SIZE, HEAD_BATCH_WORKERS
+)
+from src.utils.file_utils import preallocate_file, reserve_space, positional_write
+from src.utils.listing_parser import DirectoryListingParser, parse_directory_html
+from src.utils.download_journal import DownloadJournal, DownloadCancelledError
+from src.utils.checksums import IntegrityError
+from src.utils.lazy_import import lazy_import
+from src.utils.rate_limiter import BandwidthLimiter
+from src.utils.retry import RetryScheduler, http_status, retry_after_seconds
+
+# requests (with urllib3) is the slowest import of the app; load it with the first session
+requests = lazy_import("requests")
+
+
+class RangeNotSupportedError(Exception):
+    """Raised when a server answers a Range request with the full body"""
+    pass
+
+
+class NetworkError(Exception):
+    """A failed request, carrying the HTTP status and any Retry-After delay the server sent"""
+    
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def plan_segments(total_size):
+    """Split a file into inclusive byte ranges sized to the file"""
+    if total_size < SEGMENT_MIN_SIZE:
+        return [(0, total_size - 1)] if total_size > 0 else []
+    
+    count = min(MAX_SEGMENTS_PER_FILE, max(2, -(-total_size // SEGMENT_TARGET_SIZE)))
+    segment_size = -(-total_size // count)
+    return [
+        (start, min(start + segment_size, total_size) - 1)
+        for start in range(0, total_size, segment_size)
+    ]
+
+
+class ChunkSizer:
+    """Adapt the read size so that each read takes about CHUNK_TARGET_TIME"""
+    
+    def __init__(self, minimum=CHUNK_SIZE, maximum=CHUNK_SIZE_MAX, target=CHUNK_TARGET_TIME):
+        self.size = minimum
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target = target
+        self._last = time.monotonic()
+    
+    def update(self, byte_count):
+        """Record a finished read (including its processing) and return the next read size"""
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        if byte_count >= self.size and elapsed < self.target / 2:
+            self.size = min(self.maximum, self.size * 2)
+        elif elapsed > self.target * 2:
+            self.size = max(self.minimum, self.size // 2)
+        return self.size
+
+
+def stream_chunks(response):
+    """Yield the body of a streamed response in adaptively sized chunks
+    
+    Uncompressed bodies are read into one reused buffer; each yielded view
+    is only valid until the next chunk is requested.
+    """
+    sizer = ChunkSizer()
+    if response.headers.get('content-encoding', 'identity').lower() != 'identity':
+        # Compressed bodies have to go through urllib3's decoder
+        while True:
+            chunk = response.raw.read(sizer.size, decode_content=True)
+            if not chunk:
+                return
+            yield chunk
+            sizer.update(len(chunk))
+    
+    buffer = memoryview(bytearray(sizer.size))
+    while True:
+        if len(buffer) < sizer.size:
+            buffer = memoryview(bytearray(sizer.size))
+        count = response.raw.readinto(buffer[:sizer.size])
+        if not count:
+            return
+        yield buffer[:count]
+        sizer.update(count)
+
+
+def text_decoder(encoding):
+    """Incremental decoder for a response charset, defaulting to UTF-8"""
+    try:
+        return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
 
 
 class NetworkManager:
-    """Handle all network operations"""
+    """Handle all network operations over a shared, thread-safe connection pool"""
+    
+    is_async = False
     
     def __init__(self):
         self.headers = {'User-Agent': USER_AGENT}
         self.timeout = REQUEST_TIMEOUT
+        self.bandwidth = BandwidthLimiter()
+        self.retry = RetryScheduler()
+        self.session = self._create_session()
+    
+    def _create_session(self):
+        """Create a keep-alive session with a bounded per-host connection pool"""
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        # Only dropped connections are retried here; error statuses go to the
+        # RetryScheduler, which honours Retry-After without holding a worker
+        retries = Retry(
+            total=HTTP_MAX_RETRIES,
+            status=0,
+            backoff_factor=HTTP_RETRY_BACKOFF,
+            allowed_methods=["GET", "HEAD"],
+            respect_retry_after_header=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_HOSTS,
+            pool_maxsize=HTTP_POOL_PER_HOST,
+            pool_block=True,
+            max_retries=retries
+        )
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
     
     def get_page_content(self, url):
         """Get page content with error handling"""
         try:
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
             return response.text
         except requests.RequestException as e:
-            raise Exception(f"Failed to fetch {url}: {str(e)}")
+            raise NetworkError(f"Failed to fetch {url}: {str(e)}", http_status(e), retry_after_seconds(e))
+    
+    def fetch_directory_listing(self, url, etag=None, last_modified=None):
+        """Fetch a listing page, parsing it while the body streams in"""
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        
+        try:
+            with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 304:
+                    return {'not_modified': True, 'etag': etag, 'last_modified': last_modified}
+                
+                response.raise_for_status()
+                # Resolve links against the final URL when the server redirected (e.g. to add a slash)
+                final_url = response.url
+                parser = DirectoryListingParser(final_url)
+                decoder = text_decoder(response.encoding)
+                for chunk in response.iter_content(chunk_size=LISTING_CHUNK_SIZE):
+                    parser.feed(decoder.decode(chunk))
+                parser.feed(decoder.decode(b"", final=True))
+                folders, files = parser.close()
+                
+                return {
+                    'not_modified': False,
+                    'url': final_url,
+                    'folders': folders,
+                    'files': files,
+                    'etag': response.headers.get('etag'),
+                    'last_modified': response.headers.get('last-modified')
+                }
+        except requests.RequestException as e:
+            raise NetworkError(f"Failed to fetch {url}: {str(e)}", http_status(e), retry_after_seconds(e))
     
     def parse_directory_links(self, html_content, base_url):
         """Parse HTML content to extract file and folder links"""
-        soup = BeautifulSoup(html_content, "html.parser")
-        folders = []
-        files = []
-        
-        for a in soup.find_all("a", href=True):
-            href = a["href"]
-            
-            # Skip parent directory links
-            if href in ["../", "./"]:
-                continue
-            
-            full_url = urljoin(base_url, href)
-            name = href.rstrip("/")
-            
-            if href.endswith("/"):  # It's a folder
-                folders.append({
-                    "name": name,
-                    "url": full_url
-                })
-            else:  # It's a file
-                files.append({
-                    "name": name, 
-                    "url": full_url,
-                    "href": href
-                })
-        
-        return folders, files
+        return parse_directory_html(html_content, base_url)
     
     def get_file_size(self, url):
         """Get file size from URL headers"""
         try:
-            response = requests.head(url, headers=self.headers, timeout=self.timeout)
+            response = self.session.head(url, timeout=self.timeout)
             return int(response.headers.get('content-length', 0))
         except:
             return 0
     
-    def download_file_stream(self, url, file_path, progress_callback=None):
-        """Download file with streaming and progress callback"""
+    def get_file_info(self, url):
+        """Get size, ETag and Last-Modified of a remote file"""
         try:
-            response = requests.get(url, stream=True, headers=self.headers, timeout=30)
+            response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+            response.raise_for_status()
+            return {
+                'size': int(response.headers.get('content-length', 0)),
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified')
+            }
+        except requests.RequestException as e:
+            raise NetworkError(f"Failed to fetch {url}: {str(e)}", http_status(e), retry_after_seconds(e))
+    
+    def get_file_infos(self, urls):
+        """Get file info for many URLs concurrently; failures become None"""
+        def file_info_or_none(url):
+            try:
+                return self.get_file_info(url)
+            except Exception:
+                return None
+        
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=HEAD_BATCH_WORKERS) as executor:
+            return list(executor.map(file_info_or_none, urls))
+    
+    def download_file_stream(self, url, file_path, progress_callback=None, should_stop=None, digest=None):
+        """Download file via a resumable .part file and return its size and validators
+        
+        A StreamDigest passed as digest is fed the data as it is written.
+        """
+        try:
+            response = self.session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT)
             response.raise_for_status()
             
             total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
+            accepts_ranges = response.headers.get('accept-ranges', '').lower() == 'bytes'
+            etag = response.headers.get('etag')
+            last_modified = response.headers.get('last-modified')
+            file_info = {'size': total_size, 'etag': etag, 'last_modified': last_modified}
+            
+            journal = DownloadJournal.load(file_path)
+            if journal and not (accepts_ranges and journal.matches(url, total_size, etag, last_modified)):
+                # Remote file changed (or lost range support); restart from byte zero
+                journal.discard()
+                journal = None
+            
+            if not accepts_ranges or total_size < RESUME_MIN_SIZE:
+                self._download_single(response, file_path, total_size, progress_callback, should_stop, digest)
+                return file_info
+            
+            if journal is None:
+                journal = DownloadJournal(file_path, url, total_size, etag, last_modified)
+                preallocate_file(journal.part_path, total_size)
             
-            with open(file_path, 'wb') as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        file.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        if progress_callback:
-                            progress_callback(downloaded, total_size)
+            ranges = journal.missing_ranges(plan_segments(total_size))
+            if not ranges:
+                # Complete on disk but never moved into place
+                response.close()
+                journal.finalize()
+                return file_info
             
-            return True
+            try:
+                if len(ranges) == 1 and ranges[0][0] == 0:
+                    # Nothing to skip: keep streaming the body already requested
+                    self._download_ranges(url, journal, ranges, progress_callback, should_stop, digest, response)
+                else:
+                    response.close()
+                    self._download_ranges(url, journal, ranges, progress_callback, should_stop, digest)
+            except RangeNotSupportedError:
+                # Server advertised ranges but ignored them; use one stream
+                journal.discard()
+                response = self.session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT)
+                response.raise_for_status()
+                self._download_single(response, file_path, total_size, progress_callback, should_stop, digest)
+                return file_info
+            
+            journal.finalize()
+            return file_info
+        except (DownloadCancelledError, IntegrityError):
+            raise
         except Exception as e:
-            raise Exception(f"Download failed: {str(e)}")
+            raise NetworkError(f"Download failed: {str(e)}", http_status(e), retry_after_seconds(e))
+    
+    def _download_single(self, response, file_path, total_size, progress_callback, should_stop, digest=None):
+        """Stream a whole response body into a .part file, then move it into place"""
+        part_path = file_path + PART_SUFFIX
+        host = urlsplit(response.url).hostname
+        downloaded = 0
+        
+        try:
+            with response, open(part_path, 'wb') as file:
+                reserve_space(file.fileno(), total_size)
+                for chunk in stream_chunks(response):
+                    if should_stop and should_stop():
+                        raise DownloadCancelledError(f"Stopped downloading {file_path}")
+                    
+                    if self.bandwidth.active:
+                        self.bandwidth.throttle(host, len(chunk))
+                    file.write(chunk)
+                    if digest:
+                        digest.update(chunk)
+                    downloaded += len(chunk)
+                    
+                    if progress_callback:
+                        progress_callback(downloaded, total_size)
+                
+                if total_size and downloaded != total_size:
+                    raise IntegrityError(f"Truncated at byte {downloaded} of {total_size}")
+                file.truncate()  # drop preallocated space the body did not fill
+        except BaseException:
+            # Without range support the partial data cannot be resumed
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        
+        os.replace(part_path, file_path)
+    
+    def _download_ranges(self, url, journal, ranges, progress_callback, should_stop, digest=None, response=None):
+        """Fetch the missing byte ranges concurrently into the .part file"""
+        if not ranges:
+            return
+        
+        total_size = journal.total_size
+        progress_lock = threading.Lock()
+        progress = {'downloaded': journal.completed_bytes()}
+        
+        def report(length):
+            with progress_lock:
+                progress['downloaded'] += length
+                if progress_callback:
+                    progress_callback(progress['downloaded'], total_size)
+        
+        try:
+            if len(ranges) == 1:
+                start, end = ranges[0]
+                self._download_range(url, journal, start, end, report, should_stop, digest, response)
+                return
+            
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [
+                    executor.submit(self._download_range, url, journal, start, end, report, should_stop, digest)
+                    for start, end in ranges
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            journal.save(force=True)
+    
+    def _download_range(self, url, journal, start, end, report, should_stop, digest=None, response=None):
+        """Fetch one inclusive byte range and write it at its offset"""
+        if response is None:
+            headers = {'Range': f"bytes={start}-{end}"}
+            response = self.session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT)
+            response.raise_for_status()
+            if response.status_code != 206:
+                response.close()
+                raise RangeNotSupportedError(f"Server ignored Range request for {url}")
+        
+        offset = start
+        host = urlsplit(response.url).hostname
+        with response:
+            fd = os.open(journal.part_path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+            try:
+                for chunk in stream_chunks(response):
+                    if should_stop and should_stop():
+                        raise DownloadCancelledError(f"Stopped downloading {journal.file_path}")
+                    
+                    if self.bandwidth.active:
+                        self.bandwidth.throttle(host, len(chunk))
+                    positional_write(fd, chunk, offset)
+                    if digest:
+                        digest.feed(fd, start, offset, chunk)
+                    offset += len(chunk)
+                    report(len(chunk))
+                    
+                    if journal.save_due():
+                        journal.add_range(start, offset)
+                        journal.save()
+            finally:
+                os.close(fd)
+                journal.add_range(start, offset)
+        
+        if offset != end + 1:
+            raise IntegrityError(f"Segment {start}-{end} truncated at byte {offset}")
+
+
+def create_network_manager(backend=NETWORK_BACKEND):
+    """Create the network manager for the configured backend"""
+    if backend == "asyncio":
+        from src.utils.async_network_utils import AsyncNetworkManager
+        return AsyncNetworkManager()
+    return NetworkManager()
@@ -0,0 +1,99 @@
+"""
+Token-bucket bandwidth limiting shared by all download workers
+"""
+
+import time
+import threading
+from config.settings import BANDWIDTH_LIMIT, BANDWIDTH_HOST_LIMITS, BANDWIDTH_BURST
+
+
+class TokenBucket:
+    """Byte budget refilled at `rate` bytes per second; 0 means unlimited"""
+    
+    def __init__(self, rate=0, burst=BANDWIDTH_BURST):
+        self.burst_seconds = burst
+        self._lock = threading.Lock()
+        self.rate = 0
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self.set_rate(rate)
+    
+    def set_rate(self, rate):
+        """Change the rate, effective for the next reservation"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(0, rate or 0)
+            self._tokens = min(self._tokens, self.capacity) if self.rate else 0.0
+    
+    @property
+    def capacity(self):
+        return max(self.rate * self.burst_seconds, 1)
+    
+    def _refill(self, now):
+        if self.rate:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def reserve(self, byte_count):
+        """Take byte_count tokens, going into debt if needed; returns seconds to wait"""
+        if not self.rate:
+            return 0.0
+        
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            self._refill(time.monotonic())
+            self._tokens -= byte_count
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class BandwidthLimiter:
+    """A global token bucket plus optional per-host buckets, adjustable at runtime"""
+    
+    def __init__(self, global_limit=BANDWIDTH_LIMIT, host_limits=None):
+        self.global_bucket = TokenBucket(global_limit)
+        self.host_buckets = {}
+        self._lock = threading.Lock()
+        for host, rate in (BANDWIDTH_HOST_LIMITS if host_limits is None else host_limits).items():
+            self.set_host_limit(host, rate)
+    
+    @property
+    def active(self):
+        """True when any limit is set; callers skip the limiter otherwise"""
+        return bool(self.global_bucket.rate or self.host_buckets)
+    
+    def set_global_limit(self, rate):
+        """Set the total bandwidth in bytes per second (0 for unlimited)"""
+        self.global_bucket.set_rate(rate)
+    
+    def set_host_limit(self, host, rate):
+        """Set the bandwidth of one host in bytes per second (0 removes the limit)"""
+        host = host.lower()
+        with self._lock:
+            if not rate:
+                self.host_buckets.pop(host, None)
+            elif host in self.host_buckets:
+                self.host_buckets[host].set_rate(rate)
+            else:
+                self.host_buckets[host] = TokenBucket(rate)
+    
+    def limits(self):
+        """Current global and per-host rates"""
+        return {
+            'global': self.global_bucket.rate,
+            'hosts': {host: bucket.rate for host, bucket in self.host_buckets.items()}
+        }
+    
+    def reserve(self, host, byte_count):
+        """Account for transferred bytes; returns seconds the caller should wait"""
+        delay = self.global_bucket.reserve(byte_count)
+        bucket = self.host_buckets.get(host)
+        if bucket is not None:
+            delay = max(delay, bucket.reserve(byte_count))
+        return delay
+    
+    def throttle(self, host, byte_count):
+        """Account for transferred bytes and sleep as long as the limits require"""
+        delay = self.reserve(host, byte_count)
+        if delay > 0:
+            time.sleep(delay)
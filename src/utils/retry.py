@@ -0,0 +1,155 @@
+"""
+Retry timing shared by scans and downloads: backoff with jitter, Retry-After and per-host circuit breakers
+"""
+
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+from config.settings import (
+    RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_AFTER_MAX, RETRY_STATUSES,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN
+)
+from src.utils.file_utils import parse_http_date
+from src.utils.checksums import IntegrityError
+
+
+def http_status(error):
+    """HTTP status behind a requests, aiohttp or NetworkError exception, if any"""
+    status = getattr(error, 'status', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status
+
+
+def retry_after_seconds(error):
+    """Seconds a Retry-After header on the failed response asks to wait, if any"""
+    seconds = getattr(error, 'retry_after', None)
+    if seconds is not None:
+        return seconds
+    
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or getattr(error, 'headers', None)
+    value = headers.get('Retry-After') if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        timestamp = parse_http_date(value)
+        return max(0.0, timestamp - time.time()) if timestamp else None
+
+
+class HostUnavailableError(Exception):
+    """Raised for requests to a host whose circuit keeps failing its probes"""
+    pass
+
+
+class HostCircuit:
+    """Consecutive failures of one host and until when it gets no requests"""
+    
+    def __init__(self):
+        self.failures = 0
+        self.open_until = 0.0
+        self.pauses = 0  # consecutive cooldowns; the host is given up after RETRY_MAX_ATTEMPTS
+        self.probe_started = None  # a probe that never reports back is replaced after the cooldown
+
+
+class RetryScheduler:
+    """Decide whether and when a failed listing or file is tried again
+    
+    Delays double per attempt with random jitter and never undercut a
+    Retry-After the server sent. Each host has a circuit breaker: after
+    CIRCUIT_FAILURE_THRESHOLD consecutive failures, or a throttling answer
+    with Retry-After, the host gets no requests until the pause ends; then
+    a single probe request decides whether it opens again. Waiting for a
+    paused host costs no attempts, but a host that fails max_attempts probes
+    in a row is given up.
+    """
+    
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self._circuits = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def is_retryable(error):
+        """Dropped connections, throttling, server errors and corrupt transfers are worth another try"""
+        if isinstance(error, IntegrityError):
+            return True
+        status = http_status(error)
+        return status is None or status in RETRY_STATUSES
+    
+    def backoff(self, attempt):
+        """Delay before retry number attempt + 1: half fixed, half random"""
+        delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def host_wait(self, url):
+        """Seconds until url's host takes requests again; 0 also lets the single probe through"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None:
+                return 0.0
+            if circuit.pauses >= self.max_attempts:
+                raise HostUnavailableError(f"Host {host} is not responding")
+            
+            now = time.monotonic()
+            if circuit.open_until > now:
+                return circuit.open_until - now
+            if circuit.failures < CIRCUIT_FAILURE_THRESHOLD:
+                return 0.0
+            if circuit.probe_started is not None and now - circuit.probe_started < CIRCUIT_COOLDOWN:
+                return RETRY_BASE_DELAY  # wait for the probe's outcome
+            circuit.probe_started = now
+            return 0.0
+    
+    def reset(self):
+        """Forget all host failures, e.g. when a new scan or download starts"""
+        with self._lock:
+            self._circuits.clear()
+    
+    def record_success(self, url):
+        """A request to url's host went through; close its circuit"""
+        host = urlsplit(url).netloc
+        if host in self._circuits:
+            with self._lock:
+                self._circuits.pop(host, None)
+    
+    def record_failure(self, url, error, attempt):
+        """Register failed attempt number attempt (from 0); returns seconds to wait before retrying, or None to give up"""
+        if isinstance(error, HostUnavailableError):
+            return None
+        if not self.is_retryable(error):
+            self.record_success(url)  # the host answered; only this request is hopeless
+            return None
+        
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            retry_after = min(retry_after, RETRY_AFTER_MAX)
+        
+        # A corrupt file says nothing about the host's health
+        if not isinstance(error, IntegrityError):
+            self._trip(urlsplit(url).netloc, http_status(error), retry_after)
+        
+        if attempt + 1 >= self.max_attempts:
+            return None
+        return max(self.backoff(attempt), retry_after or 0.0)
+    
+    def _trip(self, host, status, retry_after):
+        """Count a host failure and pause the host when it asks for it or keeps failing"""
+        with self._lock:
+            circuit = self._circuits.setdefault(host, HostCircuit())
+            circuit.failures += 1
+            circuit.probe_started = None
+            
+            now = time.monotonic()
+            pause = None
+            if retry_after is not None and status in (429, 503):
+                pause = retry_after
+            elif circuit.failures >= CIRCUIT_FAILURE_THRESHOLD and circuit.open_until <= now:
+                # Requests already in flight when the host was paused do not extend the pause
+                pause = CIRCUIT_COOLDOWN
+                circuit.pauses += 1
+            if pause:
+                circuit.open_until = max(circuit.open_until, now + pause)
@@ -0,0 +1,58 @@
+"""
+URL canonicalisation and the visited set that keeps a scan from fetching a listing twice
+"""
+
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlunsplit, quote, unquote
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+PATH_SAFE = "/:@!$&'()*+,;=-._~"  # RFC 3986 path characters kept unescaped
+
+
+def canonical_url(url):
+    """Normal form of a URL: lowercase scheme and host, no default port or fragment, uniform escaping"""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ""
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        host = f"{host}:{port}"
+    path = quote(unquote(parts.path), safe=PATH_SAFE) or "/"
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+
+def canonical_folder(url):
+    """Canonical URL of the folder a page lives in, ending with a slash and without a query"""
+    canonical = canonical_url(url.split("?", 1)[0].split("#", 1)[0])
+    return canonical[:canonical.rfind("/") + 1]
+
+
+class VisitedSet:
+    """Thread-safe set of canonical URLs kept as 64-bit fingerprints, small even on huge trees"""
+    
+    def __init__(self):
+        self._fingerprints = set()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def fingerprint(url):
+        digest = hashlib.blake2b(canonical_url(url).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+    
+    def add(self, url):
+        """Remember url; returns False if it (or an equivalent spelling) was added before"""
+        fingerprint = self.fingerprint(url)
+        with self._lock:
+            if fingerprint in self._fingerprints:
+                return False
+            self._fingerprints.add(fingerprint)
+            return True
+    
+    def __contains__(self, url):
+        return self.fingerprint(url) in self._fingerprints
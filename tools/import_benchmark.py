@@ -0,0 +1,79 @@
+"""
+Import-time benchmark for the core modules
+
+Run from the project root:  python tools/import_benchmark.py [--budget-ms 50] [--runs 5]
+Exits with status 1 if a module imports slower than the budget or pulls in
+a GUI/network dependency that should only load on first use.
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE_MODULES = [
+    "config.settings",
+    "src.utils.network_utils",
+    "src.core.scanner",
+    "src.core.downloader",
+    "src.cli",
+]
+
+# Dependencies that must not be executed just by importing the core modules
+DEFERRED_MODULES = [
+    "tkinter", "customtkinter", "requests", "urllib3", "aiohttp", "sqlite3", "asyncio", "bs4",
+]
+
+MEASURE_SCRIPT = """
+import sys, json, time, types
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [name for name in {deferred!r} if type(sys.modules.get(name)) is types.ModuleType]
+print(json.dumps({{"ms": elapsed * 1000, "loaded": loaded}}))
+"""
+
+
+def measure(module, runs):
+    """Best import time of a module over fresh interpreters, and the deferred modules it loaded"""
+    script = MEASURE_SCRIPT.format(root=PROJECT_ROOT, module=module, deferred=DEFERRED_MODULES)
+    best_ms, loaded = None, []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", script], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        best_ms = result["ms"] if best_ms is None else min(best_ms, result["ms"])
+        loaded = result["loaded"]
+    return best_ms, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm tra thời gian import của các module lõi")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="thời gian tối đa cho mỗi module (ms)")
+    parser.add_argument("--runs", type=int, default=5, help="số lần đo, lấy kết quả nhanh nhất")
+    args = parser.parse_args()
+    
+    failed = False
+    for module in CORE_MODULES:
+        best_ms, loaded = measure(module, max(1, args.runs))
+        problems = []
+        if best_ms > args.budget_ms:
+            problems.append(f"vượt {args.budget_ms:.0f} ms")
+        if loaded:
+            problems.append("đã nạp " + ", ".join(loaded))
+        failed = failed or bool(problems)
+        
+        status = "FAIL " + "; ".join(problems) if problems else "ok"
+        print(f"{module:<28} {best_ms:7.1f} ms  {status}")
+    
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())